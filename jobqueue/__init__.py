@@ -0,0 +1,7 @@
+"""Job-queue building blocks shared by ``queued_llm`` and ``vision_api``.
+
+Both services keep their jobs in a table with ``job_id``, ``tenant_id``,
+``created_at``, ``status``, ``lease_owner`` and ``lease_expires_at`` columns.
+The modules here work on any such model; each service binds them to its own
+model and session factory.
+"""
@@ -0,0 +1,73 @@
+"""Dynamic micro-batching of concurrent calls.
+
+Items submitted by concurrent jobs are grouped by ``key(item)``. A group is
+collected for up to ``max_wait_ms`` (or until ``max_size`` items are pending)
+and handed to ``run_batch`` as one list, so per-call overhead is paid once per
+batch instead of once per job. ``run_batch`` returns one result per item, in
+order; each caller gets back its own. If it raises, or returns the wrong
+number of results, every caller in the batch gets the error.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """Groups concurrent items with the same key into batched ``run_batch`` calls."""
+
+    def __init__(
+        self,
+        run_batch: Callable[[list[T]], Awaitable[list[R]]],
+        key: Callable[[T], Hashable],
+        max_size: int,
+        max_wait_ms: float,
+    ) -> None:
+        self._run_batch = run_batch
+        self._key = key
+        self.max_size = max_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: dict[Hashable, list[tuple[T, asyncio.Future]]] = {}
+        self._timers: dict[Hashable, asyncio.TimerHandle] = {}
+        # The loop only keeps weak references to tasks; hold running batches here.
+        self._running: set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        """Queue one item and wait for its result from the next batch."""
+        key = self._key(item)
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((item, future))
+
+        if len(batch) >= self.max_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = asyncio.get_running_loop().call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key: Hashable) -> None:
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            task = asyncio.create_task(self._execute(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, batch: list[tuple[T, asyncio.Future]]) -> None:
+        try:
+            results = await self._run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch of {len(batch)} items returned {len(results)} results")
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,183 @@
+"""Bounded job dispatcher backed by leases on a jobs table.
+
+A feeder loop claims queued jobs (see ``Leases.claim_jobs``) into an internal
+queue, never holding more than the worker pool can run, and a fixed pool of
+worker coroutines executes them. Free slots are split across tenants by a
+``FairScheduler``. A heartbeat keeps the leases of held jobs
+alive. Because work is pulled from the DB rather than pushed by the process
+that accepted the request, any number of API processes and standalone
+executors (``python -m queued_llm.worker``) can share the load, and jobs
+orphaned by a dead process are retaken once their lease expires.
+
+A process that inserts a job already leased to itself (see ``new_lease``),
+e.g. to run it from a local copy of the upload, hands it over with
+``submit_leased``. It waits in this process, still counted in its tenant's
+queue, until the scheduler gives that tenant a slot.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy.engine import Row
+
+from .leases import LEASE_TTL, Leases
+from .scheduler import FairScheduler
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_CONCURRENCY = int(os.environ.get("DISPATCH_CONCURRENCY", "16"))
+DISPATCH_MAX_BACKLOG = int(os.environ.get("DISPATCH_MAX_BACKLOG", "1000"))
+DISPATCH_RETRY_AFTER = int(os.environ.get("DISPATCH_RETRY_AFTER", "5"))
+DISPATCH_POLL_INTERVAL = float(os.environ.get("DISPATCH_POLL_INTERVAL", "1.0"))
+
+
+class LeasedJob(NamedTuple):
+    """A job inserted already leased to this process; shaped like a ``claim_jobs`` row."""
+
+    job_id: str
+    tenant_id: str
+    created_at: datetime
+
+
+class Dispatcher:
+    """Fixed-size worker pool fed by lease claims on the jobs table."""
+
+    def __init__(
+        self,
+        run_job: Callable[[str], Awaitable[None]],
+        leases: Leases,
+        concurrency: int = DISPATCH_CONCURRENCY,
+        max_backlog: int = DISPATCH_MAX_BACKLOG,
+        poll_interval: float = DISPATCH_POLL_INTERVAL,
+        scheduler: FairScheduler | None = None,
+    ) -> None:
+        self._run_job = run_job
+        self.leases = leases
+        self.scheduler = scheduler or FairScheduler()
+        self.concurrency = concurrency
+        self.max_backlog = max_backlog
+        self.poll_interval = poll_interval
+        self._queue: asyncio.Queue[Row] = asyncio.Queue()
+        self._held: set[str] = set()  # claimed by this process, queued or running
+        self._leased: dict[str, deque[LeasedJob]] = {}  # submitted leased, waiting for a slot
+        self._wakeup = asyncio.Event()
+        self._unclaimed = 0
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._held) - self._queue.qsize()
+
+    @property
+    def backlog(self) -> int:
+        """Jobs waiting for a worker: unclaimed rows in the DB (and leased submissions) plus claimed-but-not-started."""
+        return self._unclaimed + self._queue.qsize()
+
+    def is_saturated(self) -> bool:
+        return self.backlog >= self.max_backlog
+
+    def is_idle(self) -> bool:
+        return self._unclaimed == 0 and not self._held and not self._leased
+
+    def submit(self, job_id: str) -> None:
+        """Signal that a new queued row exists so it is claimed without waiting for the next poll.
+
+        Admission control is the caller's job (see ``is_saturated``); a job that
+        already has a DB row is always accepted.
+        """
+        self.submit_many([job_id])
+
+    def submit_many(self, job_ids: list[str]) -> None:
+        """Signal a batch of new queued rows with a single wakeup."""
+        self._unclaimed += len(job_ids)
+        self._wakeup.set()
+
+    def submit_leased(self, job: LeasedJob) -> None:
+        """Queue a job this process inserted with ``new_lease``; it runs here in its tenant's turn."""
+        self._leased.setdefault(job.tenant_id, deque()).append(job)
+        self._unclaimed += 1
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._feeder()))
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _feeder(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                rows = await self._claim()
+            except Exception:
+                logger.exception("Failed to claim jobs")
+                rows = []
+            for row in rows:
+                self._held.add(row.job_id)
+                self._queue.put_nowait(row)
+
+            # Woken early by a new submission or a worker freeing up.
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self) -> list[Row | LeasedJob]:
+        async with self.leases.session_factory() as session:
+            queued, leased = await self.leases.tenant_counts(session)
+            # Leased submissions are held in the table but still waiting here.
+            for tenant, jobs in self._leased.items():
+                queued[tenant] = queued.get(tenant, 0) + len(jobs)
+                leased[tenant] = max(leased.get(tenant, 0) - len(jobs), 0)
+            grants = self.scheduler.allocate(queued, leased, self.concurrency - len(self._held))
+            # Each grant goes to the tenant's waiting submissions first. Claim from
+            # the table before taking them, so a failed claim leaves them waiting
+            # (and renewed) here.
+            local = {tenant: min(n, len(self._leased.get(tenant, ()))) for tenant, n in grants.items()}
+            claimed = {
+                tenant: await self.leases.claim_jobs(session, n - local[tenant], tenant_id=tenant)
+                for tenant, n in grants.items()
+            }
+            rows: list[Row | LeasedJob] = []
+            for tenant, n in local.items():
+                if n:
+                    jobs = self._leased[tenant]
+                    rows += [jobs.popleft() for _ in range(n)]
+                    if not jobs:
+                        del self._leased[tenant]
+                rows += claimed[tenant]
+        self._unclaimed = sum(queued.values()) - len(rows)
+        return rows
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(LEASE_TTL / 3)
+            try:
+                waiting = [job.job_id for jobs in self._leased.values() for job in jobs]
+                async with self.leases.session_factory() as session:
+                    await self.leases.renew_leases(session, [*self._held, *waiting])
+            except Exception:
+                logger.exception("Failed to renew leases")
+
+    async def _worker(self) -> None:
+        while True:
+            row = await self._queue.get()
+            self.scheduler.record_start(row.tenant_id, row.created_at)
+            try:
+                await self._run_job(row.job_id)
+            except Exception:
+                logger.exception("Job %s crashed in dispatcher", row.job_id)
+            finally:
+                self._held.discard(row.job_id)
+                self._queue.task_done()
+                self._wakeup.set()
@@ -0,0 +1,190 @@
+"""Job state transitions as conditional UPDATEs with coalesced writes.
+
+Each transition is a single ``UPDATE <jobs> ... WHERE job_id = ? AND status ...``
+statement, so there is no read-modify-write round trip and a transition that
+lost a race (e.g. the job was already finished by an executor that retook it)
+is a no-op. Transitions requested by concurrent jobs are buffered for at most
+``JOBSTATE_FLUSH_MS`` and written together in one transaction: all pending
+starts as one ``UPDATE ... WHERE job_id IN (...) RETURNING``, all pending
+finishes as one executemany. Callers wait for the transaction that carries
+their write to commit, so a returned ``finish`` is durable.
+"""
+
+import asyncio
+import os
+from collections import Counter
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+JOBSTATE_FLUSH_MS = float(os.environ.get("JOBSTATE_FLUSH_MS", "10"))
+JOBSTATE_MAX_BATCH = int(os.environ.get("JOBSTATE_MAX_BATCH", "500"))
+
+
+class JobStateStore:
+    """Buffers ``running`` / terminal transitions and writes them in batched transactions.
+
+    ``start`` returns the ``returning`` columns of the started job. ``finish``
+    sets ``finish_columns`` along with the status. Subclasses give ``finish`` its
+    typed signature and can write more rows in the same transaction by
+    overriding ``_write_finished``.
+    """
+
+    def __init__(
+        self,
+        model: type,
+        returning: Sequence[str],
+        finish_columns: Sequence[str],
+        session_factory: async_sessionmaker,
+        active: Sequence[str],
+        running: str,
+        flush_ms: float = JOBSTATE_FLUSH_MS,
+        max_batch: int = JOBSTATE_MAX_BATCH,
+    ) -> None:
+        self.model = model
+        self.returning = list(returning)
+        self.finish_columns = list(finish_columns)
+        self.active = list(active)
+        self.running = running
+        self._session_factory = session_factory
+        self.flush_delay = flush_ms / 1000
+        self.max_batch = max_batch
+        self._starts: dict[str, list[asyncio.Future]] = {}
+        self._finishes: list[tuple[dict, Any, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._writing: set[asyncio.Task] = set()
+        # Transactions run one at a time (SQLite has one writer anyway); writes
+        # arriving meanwhile pile up into the next batch.
+        self._lock = asyncio.Lock()
+        self.counters: Counter[str] = Counter()
+
+    async def start(self, job_id: str) -> Row | None:
+        """Mark a queued (or retaken) job ``running`` and return its ``returning`` columns.
+
+        Returns None if the job does not exist or has already finished.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._starts.setdefault(job_id, []).append(future)
+        self._schedule()
+        return await future
+
+    async def _finish(self, job_id: str, status: str, extra: Any = None, **values) -> None:
+        """Record a running job's terminal state and release its lease.
+
+        ``values`` fill ``finish_columns`` (missing ones are set to NULL);
+        ``extra`` is passed through to ``_write_finished``.
+        """
+        params = {f"b_{column}": values.get(column) for column in self.finish_columns}
+        params.update(b_job_id=job_id, b_status=status, b_completed_at=datetime.now(timezone.utc))
+        future = asyncio.get_running_loop().create_future()
+        self._finishes.append((params, extra, future))
+        self._schedule()
+        await future
+
+    async def flush(self) -> None:
+        """Write everything buffered now and wait for all pending transactions."""
+        self._flush()
+        if self._writing:
+            await asyncio.gather(*self._writing, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "flush_ms": self.flush_delay * 1000,
+            "pending": len(self._starts) + len(self._finishes),
+            **{name: self.counters[name] for name in ("transactions", "starts", "finishes")},
+        }
+
+    def _schedule(self) -> None:
+        if len(self._starts) + len(self._finishes) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_delay, self._flush)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._starts and not self._finishes:
+            return
+        starts, self._starts = self._starts, {}
+        finishes, self._finishes = self._finishes, []
+        task = asyncio.create_task(self._write(starts, finishes))
+        self._writing.add(task)
+        task.add_done_callback(self._writing.discard)
+
+    async def _write_finished(self, session: AsyncSession, finished: list[tuple[str, Any]]) -> None:
+        """Hook for extra writes in the transaction that finishes ``(job_id, extra)`` jobs.
+
+        Only gets the finishes that took effect and were given an ``extra``. A
+        finish for a job that was no longer running (already finished by an
+        executor that retook it) is left out.
+        """
+
+    async def _applied(self, session: AsyncSession, finishes: list[tuple[dict, Any]]) -> list[tuple[str, Any]]:
+        # The executemany has no per-row rowcount; a finish applied if the row
+        # now carries the completed_at it set.
+        job = self.model
+        stmt = select(job.job_id, job.completed_at).where(job.job_id.in_({p["b_job_id"] for p, _ in finishes}))
+        stamped = set((await session.execute(stmt)).all())
+        return [(p["b_job_id"], extra) for p, extra in finishes if (p["b_job_id"], p["b_completed_at"]) in stamped]
+
+    async def _write(
+        self,
+        starts: dict[str, list[asyncio.Future]],
+        finishes: list[tuple[dict, Any, asyncio.Future]],
+    ) -> None:
+        job = self.model
+        jobs = job.__table__
+        try:
+            async with self._lock, self._session_factory() as session:
+                inputs: dict[str, Row] = {}
+                if starts:
+                    stmt = (
+                        update(job)
+                        .where(job.job_id.in_(list(starts)), job.status.in_(self.active))
+                        .values(status=self.running)
+                        .returning(job.job_id, *(getattr(job, column) for column in self.returning))
+                        .execution_options(synchronize_session=False)
+                    )
+                    inputs = {row.job_id: row for row in await session.execute(stmt)}
+                if finishes:
+                    stmt = (
+                        update(jobs)
+                        .where(jobs.c.job_id == bindparam("b_job_id"), jobs.c.status == self.running)
+                        .values(
+                            status=bindparam("b_status"),
+                            completed_at=bindparam("b_completed_at"),
+                            lease_owner=None,
+                            lease_expires_at=None,
+                            **{column: bindparam(f"b_{column}") for column in self.finish_columns},
+                        )
+                    )
+                    await session.execute(stmt, [params for params, _, _ in finishes])
+                    extras = [(params, extra) for params, extra, _ in finishes if extra is not None]
+                    if extras:
+                        await self._write_finished(session, await self._applied(session, extras))
+                await session.commit()
+        except Exception as exc:
+            for futures in starts.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(exc)
+            for _, _, future in finishes:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.counters["transactions"] += 1
+        self.counters["starts"] += len(inputs)
+        self.counters["finishes"] += len(finishes)
+        for job_id, futures in starts.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(inputs.get(job_id))
+        for _, _, future in finishes:
+            if not future.done():
+                future.set_result(None)
@@ -0,0 +1,123 @@
+"""Lease-based job claiming so any number of executor processes can share a jobs table.
+
+A job is claimable when it is ``queued`` or ``running`` and has no live lease.
+Claiming stamps ``lease_owner`` / ``lease_expires_at`` in a single
+``UPDATE ... WHERE job_id IN (SELECT ... LIMIT n) RETURNING`` statement. On
+Postgres the inner select takes ``FOR UPDATE SKIP LOCKED`` so concurrent
+claimers never block on or double-claim the same rows; SQLite serialises
+writers, which gives the same guarantee. Owners renew leases with a heartbeat
+while a job runs; a crashed owner's leases expire and its jobs are retaken.
+"""
+
+import os
+import socket
+import uuid
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+LEASE_TTL = float(os.environ.get("LEASE_TTL", "30"))
+
+# Identifies this process as a lease owner. Unique per process start.
+WORKER_ID = os.environ.get("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _expiry(now: datetime) -> datetime:
+    return now + timedelta(seconds=LEASE_TTL)
+
+
+def new_lease(owner: str = WORKER_ID) -> dict:
+    """Column values for a job that is leased to ``owner`` from the moment it is inserted."""
+    return {"lease_owner": owner, "lease_expires_at": _expiry(datetime.now(timezone.utc))}
+
+
+class Leases:
+    """Lease operations on one job model's table.
+
+    ``active`` are the statuses a job can be claimed in (queued and running).
+    """
+
+    def __init__(self, model: type, session_factory: async_sessionmaker, active: Sequence[str]) -> None:
+        self.model = model
+        self.session_factory = session_factory
+        self.active = list(active)
+
+    def _claimable(self, now: datetime):
+        job = self.model
+        return (
+            job.status.in_(self.active),
+            or_(job.lease_expires_at.is_(None), job.lease_expires_at < now),
+        )
+
+    async def claim_jobs(
+        self,
+        session: AsyncSession,
+        limit: int,
+        owner: str = WORKER_ID,
+        tenant_id: str | None = None,
+    ) -> list[Row]:
+        """Atomically lease up to ``limit`` claimable jobs (oldest first).
+
+        Returns ``(job_id, tenant_id, created_at)`` rows. ``tenant_id`` restricts the
+        claim to one tenant's jobs.
+        """
+        if limit <= 0:
+            return []
+        job = self.model
+        now = datetime.now(timezone.utc)
+        conditions = self._claimable(now)
+        if tenant_id is not None:
+            conditions += (job.tenant_id == tenant_id,)
+        candidates = (
+            select(job.job_id)
+            .where(*conditions)
+            .order_by(job.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(job)
+            .where(job.job_id.in_(candidates), *conditions)
+            .values(lease_owner=owner, lease_expires_at=_expiry(now))
+            .returning(job.job_id, job.tenant_id, job.created_at)
+            .execution_options(synchronize_session=False)
+        )
+        rows = (await session.execute(stmt)).all()
+        await session.commit()
+        return rows
+
+    async def renew_leases(self, session: AsyncSession, job_ids: list[str], owner: str = WORKER_ID) -> None:
+        """Heartbeat: push out the expiry of leases still held by ``owner``."""
+        if not job_ids:
+            return
+        job = self.model
+        stmt = (
+            update(job)
+            .where(job.job_id.in_(job_ids), job.lease_owner == owner)
+            .values(lease_expires_at=_expiry(datetime.now(timezone.utc)))
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(stmt)
+        await session.commit()
+
+    async def tenant_counts(self, session: AsyncSession) -> tuple[dict[str, int], dict[str, int]]:
+        """Per-tenant ``(queued, leased)`` counts: unclaimed backlog and jobs held by any executor."""
+        job = self.model
+        now = datetime.now(timezone.utc)
+        live = and_(job.lease_expires_at.is_not(None), job.lease_expires_at >= now)
+        stmt = (
+            select(job.tenant_id, case((live, True), else_=False).label("leased"), func.count())
+            .where(job.status.in_(self.active))
+            .group_by(job.tenant_id, "leased")
+        )
+        queued: dict[str, int] = {}
+        leased: dict[str, int] = {}
+        for tenant, is_leased, n in await session.execute(stmt):
+            if is_leased:
+                leased[tenant] = n
+            else:
+                queued[tenant] = n
+        return queued, leased
@@ -0,0 +1,110 @@
+"""Per-tenant deficit round-robin scheduling for job claims.
+
+A dispatcher asks the scheduler how to split its free worker slots across
+tenants that have queued work. Each round a tenant's deficit grows by its
+weight and it may start one job per whole unit of deficit, up to its
+concurrency cap, so a tenant flooding the queue gets its weighted share of
+workers instead of all of them and small tenants see bounded queueing delay.
+"""
+
+import statistics
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+# Recent queue waits kept per tenant for stats.
+WAIT_WINDOW = 1000
+
+
+class FairScheduler:
+    """Weighted deficit round-robin across tenants."""
+
+    def __init__(
+        self,
+        weights: dict[str, float] | None = None,
+        max_concurrency: dict[str, int] | None = None,
+        default_weight: float = 1.0,
+        default_max_concurrency: int | None = None,
+    ) -> None:
+        self.weights = weights or {}
+        self.max_concurrency = max_concurrency or {}
+        self.default_weight = default_weight
+        self.default_max_concurrency = default_max_concurrency
+        self._deficit: dict[str, float] = defaultdict(float)
+        self._order: deque[str] = deque()
+        self._queued: dict[str, int] = {}
+        self._leased: dict[str, int] = {}
+        self._waits: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=WAIT_WINDOW))
+
+    def weight(self, tenant: str) -> float:
+        return self.weights.get(tenant, self.default_weight)
+
+    def cap(self, tenant: str) -> int | None:
+        return self.max_concurrency.get(tenant, self.default_max_concurrency)
+
+    def allocate(self, queued: dict[str, int], leased: dict[str, int], slots: int) -> dict[str, int]:
+        """Split ``slots`` free workers across tenants.
+
+        ``queued`` is each tenant's unclaimed backlog and ``leased`` the number of
+        its jobs currently held by any executor (counted against its cap).
+        """
+        self._queued, self._leased = dict(queued), dict(leased)
+
+        for tenant in queued:
+            if tenant not in self._order:
+                self._order.append(tenant)
+        for tenant in list(self._order):
+            if not queued.get(tenant):
+                # Idle tenants do not bank credit (standard DRR).
+                self._order.remove(tenant)
+                self._deficit.pop(tenant, None)
+
+        grants: dict[str, int] = defaultdict(int)
+
+        def room(tenant: str) -> int:
+            left = queued[tenant] - grants[tenant]
+            cap = self.cap(tenant)
+            if cap is not None:
+                left = min(left, cap - leased.get(tenant, 0) - grants[tenant])
+            return left
+
+        while slots > 0:
+            eligible = [t for t in self._order if room(t) > 0 and self.weight(t) > 0]
+            if not eligible:
+                break
+            for tenant in eligible:
+                self._deficit[tenant] += self.weight(tenant)
+                take = min(int(self._deficit[tenant]), room(tenant), slots)
+                if take > 0:
+                    grants[tenant] += take
+                    self._deficit[tenant] -= take
+                    slots -= take
+                if slots == 0:
+                    break
+            # Start the next pass with a different tenant so ties rotate.
+            self._order.rotate(-1)
+
+        return {t: n for t, n in grants.items() if n}
+
+    def record_start(self, tenant: str, created_at: datetime) -> None:
+        """Record how long a job waited between submission and starting."""
+        waited = datetime.now(timezone.utc) - created_at
+        self._waits[tenant].append(waited.total_seconds())
+
+    def stats(self, tenant: str) -> dict:
+        waits = sorted(self._waits.get(tenant, ()))
+        return {
+            "weight": self.weight(tenant),
+            "max_concurrency": self.cap(tenant),
+            "queued": self._queued.get(tenant, 0),
+            "leased": self._leased.get(tenant, 0),
+            "wait_seconds": {
+                "samples": len(waits),
+                "mean": round(statistics.fmean(waits), 3) if waits else None,
+                "p95": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else None,
+                "max": round(waits[-1], 3) if waits else None,
+            },
+        }
+
+    def all_stats(self) -> dict[str, dict]:
+        tenants = set(self._queued) | set(self._leased) | set(self._waits)
+        return {t: self.stats(t) for t in sorted(tenants)}
@@ -0,0 +1,98 @@
+"""In-place upgrade of a database created by an older version.
+
+``create_all`` only creates missing tables. ``upgrade_schema`` runs it and then
+brings existing tables up to date:
+
+- columns added to a model since the table was created are added with
+  ``ALTER TABLE ... ADD COLUMN``; existing rows get the column's scalar
+  default, so a NOT NULL column needs one;
+- timestamp columns that older versions stored as ISO-8601 strings are
+  converted to the model's timestamp type (rewritten in place on SQLite,
+  ``ALTER COLUMN ... TYPE`` on Postgres);
+- indexes declared on the models but missing from the table are created, and
+  single-column ``ix_<table>_<column>`` indexes that a model no longer declares
+  are dropped.
+
+Every step checks the live schema first, so it is a no-op once the database
+is current. (SQLite keeps a converted column's old declared type, so there it
+scans that column for leftover text on each start.) Run it with
+``await conn.run_sync(upgrade_schema, Base.metadata)``.
+"""
+
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Enum, MetaData, String, Table, inspect, literal, select, text, type_coerce, update
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+
+def _is_timestamp(column) -> bool:
+    return isinstance(getattr(column.type, "impl_instance", column.type), DateTime)
+
+
+def _add_column(conn: Connection, table: Table, column) -> None:
+    dialect = conn.dialect
+    if isinstance(column.type, Enum) and dialect.name == "postgresql":
+        column.type.create(conn, checkfirst=True)
+    ddl = f"ALTER TABLE {dialect.identifier_preparer.format_table(table)} ADD COLUMN "
+    ddl += f"{dialect.identifier_preparer.format_column(column)} {column.type.compile(dialect=dialect)}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        value = literal(default, type_=column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" DEFAULT {value}"
+    elif not column.nullable:
+        raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} without a default")
+    if not column.nullable:
+        ddl += " NOT NULL"
+    conn.execute(text(ddl))
+    logger.info("Added column %s.%s", table.name, column.name)
+
+
+def _convert_timestamps(conn: Connection, table: Table, name: str) -> None:
+    column = table.c[name]
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            f'ALTER TABLE "{table.name}" ALTER COLUMN "{name}" '
+            f'TYPE TIMESTAMP WITH TIME ZONE USING "{name}"::timestamptz'
+        ))
+    elif conn.dialect.name == "sqlite":
+        # SQLite keeps the declared type; only the stored text has to match what
+        # the timestamp type writes ("YYYY-MM-DD HH:MM:SS.ffffff", UTC).
+        (pk,) = table.primary_key.columns
+        raw = type_coerce(column, String)
+        rows = conn.execute(select(pk, raw).where(raw.like("%T%"))).all()
+        for key, value in rows:
+            parsed = datetime.fromisoformat(value)
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            conn.execute(update(table).where(pk == key).values({name: parsed}))
+    else:
+        raise RuntimeError(f"Cannot convert {table.name}.{name} to a timestamp on {conn.dialect.name}")
+    logger.info("Converted %s.%s from text to timestamps", table.name, name)
+
+
+def upgrade_schema(conn: Connection, metadata: MetaData) -> None:
+    """Create missing tables and upgrade existing ones to match ``metadata``."""
+    metadata.create_all(conn)
+    inspector = inspect(conn)
+    for table in metadata.sorted_tables:
+        existing = {column["name"]: column for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            old = existing.get(column.name)
+            if old is None:
+                _add_column(conn, table, column)
+            elif _is_timestamp(column) and isinstance(old["type"], String):
+                _convert_timestamps(conn, table, column.name)
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        declared = {index.name for index in table.indexes}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(conn)
+                logger.info("Created index %s", index.name)
+        # Indexes from ``index=True`` on columns that are now covered by a composite one.
+        for name in indexes - declared:
+            if name in {f"ix_{table.name}_{column.name}" for column in table.columns}:
+                conn.execute(text(f'DROP INDEX "{name}"'))
+                logger.info("Dropped index %s", name)
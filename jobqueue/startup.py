@@ -0,0 +1,83 @@
+"""Startup cost of an API module: import time, peak RSS and heavy imports.
+
+Each measurement imports the module in a fresh interpreter, so nothing is
+cached from earlier runs. ``-X importtime`` then shows which of the module's
+direct imports cost the most. Used by the ``startup`` benches and the startup
+budget tests.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+from typing import NamedTuple
+
+# The service packages sit next to jobqueue; run probes from there.
+ROOT = Path(__file__).resolve().parents[1]
+
+_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+ms = (time.perf_counter() - start) * 1000
+mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps([ms, mb, [m for m in {heavy} if m in sys.modules]]))
+"""
+
+
+class Startup(NamedTuple):
+    import_ms: float  # median over runs
+    peak_mb: float  # max over runs
+    heavy: list[str]  # heavy modules loaded in any run
+    top: list[tuple[float, str]]  # direct imports by cumulative ms, slowest first
+
+
+def _python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True, cwd=ROOT)
+
+
+def measure_startup(module: str, heavy: Sequence[str], runs: int = 5) -> Startup:
+    """Import ``module`` in ``runs`` fresh interpreters and profile one more import."""
+    probe = _PROBE.format(module=module, heavy=json.dumps(list(heavy)))
+    times, rss, loaded = [], [], set()
+    for _ in range(runs):
+        ms, mb, names = json.loads(_python("-c", probe).stdout)
+        times.append(ms)
+        rss.append(mb)
+        loaded.update(names)
+
+    top = []
+    for line in _python("-X", "importtime", "-c", f"import {module}").stderr.splitlines():
+        parts = line.split("|")
+        # Names are indented two spaces per nesting level, after one separator space.
+        if len(parts) == 3 and parts[1].strip().isdigit() and parts[2][1:].startswith("  ") and parts[2][3] != " ":
+            top.append((int(parts[1]) / 1000, parts[2].strip()))
+    top.sort(reverse=True)
+    return Startup(statistics.median(times), max(rss), sorted(loaded), top)
+
+
+def over_budget(startup: Startup, budget_ms: float, budget_mb: float) -> list[str]:
+    """Reasons ``startup`` misses the budget; empty if it is within it."""
+    failures = []
+    if startup.import_ms > budget_ms:
+        failures.append(f"import took {startup.import_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    if startup.peak_mb > budget_mb:
+        failures.append(f"peak RSS {startup.peak_mb:.1f} MB (budget {budget_mb:.0f} MB)")
+    if startup.heavy:
+        failures.append(f"imported at startup: {', '.join(startup.heavy)}")
+    return failures
+
+
+def bench_startup(module: str, heavy: Sequence[str], runs: int, budget_ms: float, budget_mb: float) -> None:
+    """Print the startup cost of ``module``; exits non-zero over budget."""
+    startup = measure_startup(module, heavy, runs)
+    print(f"{'import_ms':>10} {'rss_mb':>7}  heavy modules")
+    print(f"{startup.import_ms:>10.0f} {startup.peak_mb:>7.1f}  {', '.join(startup.heavy) or '-'}")
+    for ms, name in startup.top[:8]:
+        print(f"{ms:>10.0f}          {name}")
+
+    failures = over_budget(startup, budget_ms, budget_mb)
+    if failures:
+        raise SystemExit("Over startup budget: " + "; ".join(failures))
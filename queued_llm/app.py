@@ -1,19 +1,35 @@
 """FastAPI server that queues LLM chat completion requests as Prefect flow runs."""
 
 import asyncio
+import base64
+import json
+import os
+import time
 import uuid
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy import select
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import to_json
+from sqlalchemy import insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .database import engine, get_session
-from .flows import chat_completion_pipeline
+from jobqueue.dispatcher import DISPATCH_CONCURRENCY, DISPATCH_RETRY_AFTER, Dispatcher
+from jobqueue.scheduler import FairScheduler
+from jobqueue.schema import upgrade_schema
+
+from .batching import CHAT_BATCH_ENABLED, Completion, chat_batcher
+from .cache import CACHE_ENABLED, CompletionCache, request_key
+from .database import async_session, engine, get_session
+from .execution import Executor
+from .jobstate import JobStateStore
+from .leases import leases
 from .models import Base, Job
-from .schemas import ChatRequest, JobResponse, JobStatus
+from .notify import NOTIFY_FALLBACK_POLL, JobNotifier
+from .schemas import BulkStatusRequest, ChatRequest, JobPage, JobResponse, JobStatus
 
 # ---------------------------------------------------------------------------
 # Auth — token-to-tenant mapping
@@ -25,6 +41,16 @@ TOKENS: dict[str, str] = {
     "tok-bob-secret": "tenant-bob",
 }
 
+# Fair-share scheduling: a tenant's share of free workers is proportional to
+# its weight (default 1.0), and it never has more than its cap of jobs running
+# across all executors (default: uncapped).
+TENANT_WEIGHTS: dict[str, float] = {
+    "tenant-alice": 1.0,
+    "tenant-bob": 1.0,
+}
+
+TENANT_MAX_CONCURRENCY: dict[str, int] = {}
+
 bearer_scheme = HTTPBearer()
 
 
@@ -39,15 +65,18 @@ async def get_tenant(
 
 
 # ---------------------------------------------------------------------------
-# App lifecycle — create tables on startup
+# App lifecycle — create tables and start the dispatcher on startup
 # ---------------------------------------------------------------------------
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema, Base.metadata)
+    await dispatcher.start()
     yield
+    await dispatcher.stop()
+    await jobstate.flush()
     await engine.dispose()
 
 
@@ -63,34 +92,89 @@ app = FastAPI(
 # ---------------------------------------------------------------------------
 
 
-async def _run_job(job_id: str) -> None:
-    """Background coroutine that runs the Prefect flow and updates the DB."""
-    from .database import async_session
+# Set to false to make API processes submit-only and leave execution to
+# standalone ``python -m queued_llm.worker`` executors.
+DISPATCH_IN_API = os.environ.get("DISPATCH_IN_API", "true").lower() == "true"
 
-    async with async_session() as session:
-        job = await session.get(Job, job_id)
-        if not job:
-            return
+# State changes published by _run_job, consumed by long-poll / SSE waiters.
+notifier = JobNotifier()
 
-        job.status = JobStatus.running
-        await session.commit()
+TERMINAL = (JobStatus.completed, JobStatus.failed)
 
-        try:
-            req = job.request
-            messages = req.get("messages", [])
-            result = await chat_completion_pipeline(
-                model=req.get("model", "mock-gpt"),
-                messages=messages,
-                temperature=req.get("temperature", 0.7),
-            )
-            job.result = result
-            job.status = JobStatus.completed
-        except Exception as exc:
-            job.error = str(exc)
-            job.status = JobStatus.failed
-
-        job.completed_at = datetime.now(timezone.utc).isoformat()
-        await session.commit()
+# Max requests accepted by one POST /v1/chat/completions:batch call, and the
+# max body size, enforced while the body arrives and before it is parsed.
+BULK_MAX_ITEMS = 1000
+BULK_MAX_MB = float(os.environ.get("BULK_MAX_MB", "16"))
+
+# Seconds between SSE keepalive comments while a job is still pending.
+SSE_KEEPALIVE = 15.0
+
+# Identical requests are answered from the cache, and concurrent identical
+# requests share one execution.
+cache = CompletionCache() if CACHE_ENABLED else None
+
+
+async def _run_batch(model: str, batch: list[list[dict]], temperature: float) -> list[dict]:
+    # Prefect is imported on the first batch, not at API startup (see execution.py).
+    from .flows import chat_completion_batch_pipeline
+
+    return await chat_completion_batch_pipeline(model, batch, temperature)
+
+
+# Optional batching stage: concurrent jobs with the same model/temperature
+# share one chat_completion_batch_pipeline run.
+batcher = chat_batcher(_run_batch) if CHAT_BATCH_ENABLED else None
+
+# Unbatched jobs run per EXECUTION_MODE: a flow run each, task runs in a shared
+# flow run, or the task function directly with sampled flow runs.
+executor = Executor()
+
+# Job state transitions from concurrent jobs are coalesced into batched UPDATEs.
+jobstate = JobStateStore()
+
+
+async def _run_job(job_id: str) -> None:
+    """Background coroutine that runs the Prefect flow and records the outcome."""
+    job = await jobstate.start(job_id)
+    if job is None:
+        return
+    req = job.request
+    notifier.publish(job_id, {"status": JobStatus.running})
+
+    result = error = None
+    try:
+        completion = Completion(
+            model=req.get("model", "mock-gpt"),
+            messages=req.get("messages", []),
+            temperature=req.get("temperature", 0.7),
+        )
+
+        async def execute() -> dict:
+            if batcher:
+                return await batcher.submit(completion)
+            return await executor.run(**completion._asdict())
+
+        if cache:
+            result = await cache.get_or_compute(request_key(job.tenant_id, req), execute)
+        else:
+            result = await execute()
+        status = JobStatus.completed
+    except Exception as exc:
+        error = str(exc)
+        status = JobStatus.failed
+
+    await jobstate.finish(job_id, status, result=result, error=error)
+    notifier.publish(job_id, {"status": status, "result": result, "error": error})
+
+
+# A submit-only API process still runs the feeder (with no workers) so that
+# admission control sees the shared backlog.
+dispatcher = Dispatcher(
+    _run_job,
+    leases,
+    concurrency=DISPATCH_CONCURRENCY if DISPATCH_IN_API else 0,
+    scheduler=FairScheduler(TENANT_WEIGHTS, TENANT_MAX_CONCURRENCY),
+)
 
 
 # ---------------------------------------------------------------------------
@@ -105,18 +189,131 @@ async def create_completion(
     session: AsyncSession = Depends(get_session),
 ) -> dict:
     """Submit a chat completion request. Returns a job ID immediately."""
-    job_id = str(uuid.uuid4())
+    request = req.model_dump()
+    now = datetime.now(timezone.utc)
     job = Job(
-        job_id=job_id,
+        job_id=str(uuid.uuid4()),
         tenant_id=tenant,
         status=JobStatus.queued,
-        created_at=datetime.now(timezone.utc).isoformat(),
-        request=req.model_dump(),
+        created_at=now,
+        request=request,
     )
+
+    cached = await cache.get(request_key(tenant, request)) if cache else None
+    if cached is not None:
+        # Cache hit: record the job as already completed, no execution needed.
+        job.status = JobStatus.completed
+        job.completed_at = now
+        job.result = cached
+    elif dispatcher.is_saturated():
+        raise HTTPException(
+            status_code=429,
+            detail="Job backlog is full, retry later",
+            headers={"Retry-After": str(DISPATCH_RETRY_AFTER)},
+        )
+
     session.add(job)
     await session.commit()
-    asyncio.create_task(_run_job(job_id))
-    return {"job_id": job_id, "status": job.status}
+    if job.status == JobStatus.queued:
+        dispatcher.submit(job.job_id)
+    return {"job_id": job.job_id, "status": job.status}
+
+
+_chat_request_list = TypeAdapter(list[ChatRequest])
+
+
+def _bulk_too_large(detail: str = f"Batch body exceeds {BULK_MAX_MB:g} MB") -> HTTPException:
+    return HTTPException(status_code=413, detail=detail)
+
+
+async def _parse_bulk(request: Request) -> list[ChatRequest]:
+    """Parse a JSON array, or NDJSON (one ChatRequest per line) for application/x-ndjson.
+
+    Bodies over ``BULK_MAX_MB`` get 413 up front from ``Content-Length`` or as
+    soon as they cross it. NDJSON is parsed line by line as it arrives and
+    stops after ``BULK_MAX_ITEMS`` requests.
+    """
+    max_bytes = int(BULK_MAX_MB * 1024 * 1024)
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        raise _bulk_too_large()
+    ndjson = "ndjson" in request.headers.get("content-type", "")
+    body = bytearray()
+    reqs: list[ChatRequest] = []
+    size = 0
+
+    def add_lines(lines: list[bytes]) -> None:
+        for line in lines:
+            if line.strip():
+                reqs.append(ChatRequest.model_validate_json(bytes(line)))
+                if len(reqs) > BULK_MAX_ITEMS:
+                    raise _bulk_too_large(f"At most {BULK_MAX_ITEMS} requests per batch")
+
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_bytes:
+                raise _bulk_too_large()
+            body += chunk
+            if ndjson:
+                *lines, rest = body.split(b"\n")
+                body = bytearray(rest)
+                add_lines(lines)
+        if ndjson:
+            add_lines([body])
+            return reqs
+        return _chat_request_list.validate_json(bytes(body))
+    except ValidationError as exc:
+        # Inputs of malformed JSON are raw bytes, which the error response can't encode.
+        raise HTTPException(status_code=422, detail=exc.errors(include_url=False, include_input=False))
+
+
+@app.post("/v1/chat/completions:batch", status_code=202)
+async def create_completions_bulk(
+    request: Request,
+    tenant: str = Depends(get_tenant),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    """Submit many chat completion requests in one call.
+
+    The body is a JSON array of requests, or NDJSON with
+    ``Content-Type: application/x-ndjson``. All jobs are inserted in a single
+    transaction; job IDs are returned in request order.
+    """
+    reqs = await _parse_bulk(request)
+    if not reqs:
+        raise HTTPException(status_code=422, detail="No requests in body")
+    if len(reqs) > BULK_MAX_ITEMS:
+        raise _bulk_too_large(f"At most {BULK_MAX_ITEMS} requests per batch")
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    for req in reqs:
+        request_dict = req.model_dump()
+        cached = await cache.get(request_key(tenant, request_dict)) if cache else None
+        row = {
+            "job_id": str(uuid.uuid4()),
+            "tenant_id": tenant,
+            "status": JobStatus.queued if cached is None else JobStatus.completed,
+            "created_at": now,
+            "completed_at": None if cached is None else now,
+            "request": request_dict,
+            "result": cached,
+        }
+        rows.append(row)
+
+    queued_ids = [row["job_id"] for row in rows if row["status"] == JobStatus.queued]
+    if queued_ids and dispatcher.backlog + len(queued_ids) > dispatcher.max_backlog:
+        raise HTTPException(
+            status_code=429,
+            detail="Job backlog is full, retry later",
+            headers={"Retry-After": str(DISPATCH_RETRY_AFTER)},
+        )
+
+    await session.execute(insert(Job), rows)
+    await session.commit()
+    dispatcher.submit_many(queued_ids)
+    return {"jobs": [{"job_id": row["job_id"], "status": row["status"]} for row in rows]}
 
 
 @app.get("/v1/jobs/{job_id}")
@@ -132,29 +329,179 @@ async def get_job(
     return JobResponse.model_validate(job)
 
 
-@app.get("/v1/jobs/{job_id}/status")
-async def get_job_status(
-    job_id: str,
+@app.post("/v1/jobs:status")
+async def get_jobs_status_bulk(
+    body: BulkStatusRequest,
     tenant: str = Depends(get_tenant),
     session: AsyncSession = Depends(get_session),
 ) -> dict:
-    """Lightweight status-only lookup for a specific job."""
-    job = await session.get(Job, job_id)
+    """Status of many jobs in one ``IN`` query. Unknown IDs are listed under ``not_found``."""
+    stmt = select(Job.job_id, Job.status).where(Job.job_id.in_(body.job_ids), Job.tenant_id == tenant)
+    found = {job_id: status for job_id, status in await session.execute(stmt)}
+    return {
+        "jobs": [{"job_id": job_id, "status": found[job_id]} for job_id in body.job_ids if job_id in found],
+        "not_found": [job_id for job_id in body.job_ids if job_id not in found],
+    }
+
+
+async def _load_owned(job_id: str, tenant: str) -> Job:
+    """Read a job in a short-lived session (not held open while waiting)."""
+    async with async_session() as session:
+        job = await session.get(Job, job_id)
     if not job or job.tenant_id != tenant:
         raise HTTPException(status_code=404, detail="Job not found")
-    return {"job_id": job.job_id, "status": job.status}
+    return job
+
+
+async def _next_event(job_id: str, events: asyncio.Queue, status: JobStatus, timeout: float) -> dict | None:
+    """Wait up to ``timeout`` seconds for the job to leave ``status``.
+
+    Events come from the in-process notifier; the DB is only re-read every
+    NOTIFY_FALLBACK_POLL seconds, for jobs run by another executor process.
+    """
+    deadline = time.monotonic() + timeout
+    while (remaining := deadline - time.monotonic()) > 0:
+        try:
+            return await asyncio.wait_for(events.get(), timeout=min(remaining, NOTIFY_FALLBACK_POLL))
+        except asyncio.TimeoutError:
+            async with async_session() as session:
+                job = await session.get(Job, job_id)
+            if job.status != status:
+                return {"status": job.status, "result": job.result, "error": job.error}
+    return None
 
 
-@app.get("/v1/jobs")
+@app.get("/v1/jobs/{job_id}/status")
+async def get_job_status(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Long-poll: seconds to wait for a status change"),
+    tenant: str = Depends(get_tenant),
+) -> dict:
+    """Lightweight status-only lookup for a specific job.
+
+    With ``?wait=N`` the request blocks until the job changes state (or N seconds
+    pass) and returns the new status.
+    """
+    with notifier.subscribe(job_id) as events:
+        status = (await _load_owned(job_id, tenant)).status
+        if wait and status not in TERMINAL:
+            event = await _next_event(job_id, events, status, wait)
+            if event:
+                status = event["status"]
+    return {"job_id": job_id, "status": status}
+
+
+@app.get("/v1/jobs/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    tenant: str = Depends(get_tenant),
+) -> StreamingResponse:
+    """Server-Sent Events stream of a job's status changes, ending once it completes or fails.
+
+    The final event carries ``result`` / ``error``.
+    """
+    job = await _load_owned(job_id, tenant)
+
+    def sse(event: dict) -> str:
+        return f"event: status\ndata: {json.dumps({'job_id': job_id, **event})}\n\n"
+
+    async def stream():
+        event = {"status": job.status}
+        if job.status in TERMINAL:
+            event.update(result=job.result, error=job.error)
+        yield sse(event)
+        # A change between the read above and subscribing is caught by the
+        # fallback DB poll in _next_event.
+        with notifier.subscribe(job_id) as events:
+            while event["status"] not in TERMINAL:
+                next_event = await _next_event(job_id, events, event["status"], SSE_KEEPALIVE)
+                if next_event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event = next_event
+                yield sse(event)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+def _encode_cursor(created_at: datetime, job_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{job_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, job_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), job_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _parse_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return list(JobResponse.model_fields)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = set(names) - set(JobResponse.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return names
+
+
+@app.get("/v1/jobs", response_model=JobPage)
 async def list_jobs(
     status: JobStatus | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="Comma-separated job fields to return, e.g. job_id,status"),
     tenant: str = Depends(get_tenant),
     session: AsyncSession = Depends(get_session),
-) -> list[JobResponse]:
-    """List all jobs for the authenticated tenant, optionally filtered by status."""
-    stmt = select(Job).where(Job.tenant_id == tenant)
+) -> Response:
+    """List jobs for the authenticated tenant, newest first, optionally filtered by status.
+
+    Pass the returned ``next_cursor`` as ``cursor`` to get the next page. Only the
+    columns named in ``fields`` are read, so leaving out ``request``/``result``
+    skips the JSON blobs.
+    """
+    names = _parse_fields(fields)
+    # The cursor columns are always read, even when not returned.
+    columns = dict.fromkeys([*names, "created_at", "job_id"])
+    stmt = select(*(getattr(Job, name) for name in columns)).where(Job.tenant_id == tenant)
     if status:
         stmt = stmt.where(Job.status == status)
-    result = await session.execute(stmt)
-    rows = result.scalars().all()
-    return [JobResponse.model_validate(r) for r in rows]
+    if cursor:
+        stmt = stmt.where(tuple_(Job.created_at, Job.job_id) < _decode_cursor(cursor))
+    stmt = stmt.order_by(Job.created_at.desc(), Job.job_id.desc()).limit(limit + 1)
+    rows = (await session.execute(stmt)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].job_id)
+
+    # Serialize row mappings straight to JSON in pydantic-core, skipping
+    # per-row model validation.
+    items = [{name: row._mapping[name] for name in names} for row in rows]
+    return Response(content=to_json({"items": items, "next_cursor": next_cursor}), media_type="application/json")
+
+
+@app.get("/v1/cache")
+async def get_cache_stats(tenant: str = Depends(get_tenant)) -> dict:
+    """Completion cache size and hit/miss/eviction counters for this process."""
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.get("/v1/queue")
+async def get_queue_stats(tenant: str = Depends(get_tenant)) -> dict:
+    """Queue depth, running jobs and recent queueing delay for the authenticated tenant."""
+    return {
+        "tenant_id": tenant,
+        **dispatcher.scheduler.stats(tenant),
+        "dispatcher": {
+            "concurrency": dispatcher.concurrency,
+            "in_flight": dispatcher.in_flight,
+            "backlog": dispatcher.backlog,
+        },
+        "execution": executor.stats(),
+        "jobstate": jobstate.stats(),
+    }
@@ -0,0 +1,42 @@
+"""Dynamic micro-batching of chat completions.
+
+Concurrent jobs that share a ``(model, temperature)`` are collected for up to
+``CHAT_BATCH_MAX_WAIT_MS`` (or until ``CHAT_BATCH_MAX_SIZE`` are pending) and
+sent as one batched provider call, so the per-call overhead (flow/task run,
+network round trip, per-request provider cost) is paid once per batch instead
+of once per job. Each caller gets back its own response. The batching itself
+is ``jobqueue.batching.MicroBatcher``.
+"""
+
+import os
+from collections.abc import Awaitable, Callable
+from typing import NamedTuple
+
+from jobqueue.batching import MicroBatcher
+
+CHAT_BATCH_ENABLED = os.environ.get("CHAT_BATCH_ENABLED", "false").lower() == "true"
+CHAT_BATCH_MAX_SIZE = int(os.environ.get("CHAT_BATCH_MAX_SIZE", "16"))
+CHAT_BATCH_MAX_WAIT_MS = float(os.environ.get("CHAT_BATCH_MAX_WAIT_MS", "20"))
+
+# run_batch(model, batch_of_messages, temperature) -> one response per conversation
+BatchRunner = Callable[[str, list[list[dict]], float], Awaitable[list[dict]]]
+
+
+class Completion(NamedTuple):
+    model: str
+    messages: list[dict]
+    temperature: float
+
+
+def chat_batcher(
+    run_batch: BatchRunner,
+    max_size: int = CHAT_BATCH_MAX_SIZE,
+    max_wait_ms: float = CHAT_BATCH_MAX_WAIT_MS,
+) -> MicroBatcher[Completion, dict]:
+    """A batcher that sends each ``(model, temperature)`` group to ``run_batch``."""
+
+    async def run(requests: list[Completion]) -> list[dict]:
+        first = requests[0]
+        return await run_batch(first.model, [r.messages for r in requests], first.temperature)
+
+    return MicroBatcher(run, lambda r: (r.model, r.temperature), max_size, max_wait_ms)
@@ -0,0 +1,348 @@
+"""Local benchmarks for the queued LLM service.
+
+    uv run python -m queued_llm.bench executors --jobs 60 --processes 1 2 4
+    uv run python -m queued_llm.bench fairness --flood 300 --trickle 20
+    uv run python -m queued_llm.bench batching --jobs 128 --sizes 1 8 32
+    uv run python -m queued_llm.bench execution --jobs 200 --modes flow batch_flow direct
+    uv run python -m queued_llm.bench jobstate --jobs 2000 [--url postgresql+asyncpg://...]
+    uv run python -m queued_llm.bench startup --runs 5 --budget-ms 2000 --budget-mb 96
+
+Point PREFECT_API_URL at a running Prefect server first; otherwise every
+executor process starts its own temporary server.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from .models import Base, Job
+from .schemas import JobStatus
+
+
+def _request(i: int) -> dict:
+    return {"model": "mock-gpt", "messages": [{"role": "user", "content": f"benchmark prompt {i}"}], "temperature": 0.7}
+
+
+async def _seed(url: str, n_jobs: int, tenant: str = "tenant-bench") -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Job),
+            [
+                {
+                    "job_id": str(uuid.uuid4()),
+                    "tenant_id": tenant,
+                    "status": JobStatus.queued,
+                    "created_at": datetime.now(timezone.utc),
+                    "request": _request(i),
+                }
+                for i in range(n_jobs)
+            ],
+        )
+    await engine.dispose()
+
+
+async def _count_completed(url: str) -> int:
+    engine = create_async_engine(url)
+    async with engine.connect() as conn:
+        stmt = select(func.count()).select_from(Job).where(Job.status.in_([JobStatus.completed, JobStatus.failed]))
+        n = (await conn.execute(stmt)).scalar_one()
+    await engine.dispose()
+    return n
+
+
+def bench_executors(args: argparse.Namespace) -> None:
+    """Drain the same job set with 1..N executor processes and report jobs/sec."""
+    print(f"{'processes':>9} {'jobs':>6} {'seconds':>8} {'jobs/s':>8}")
+    for n_procs in args.processes:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite+aiosqlite:///{Path(tmp) / 'jobs.db'}"
+            asyncio.run(_seed(url, args.jobs))
+            env = {**os.environ, "DATABASE_URL": url}
+
+            start = time.perf_counter()
+            procs = [
+                subprocess.Popen(
+                    [sys.executable, "-m", "queued_llm.worker",
+                     "--concurrency", str(args.concurrency), "--exit-when-idle"],
+                    env=env,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+                for _ in range(n_procs)
+            ]
+            for p in procs:
+                p.wait()
+            elapsed = time.perf_counter() - start
+
+            done = asyncio.run(_count_completed(url))
+            print(f"{n_procs:>9} {done:>6} {elapsed:>8.2f} {done / elapsed:>8.2f}")
+
+
+def bench_fairness(args: argparse.Namespace) -> None:
+    """Flood one tenant, trickle another, and report per-tenant queueing delay."""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{Path(tmp) / 'jobs.db'}"
+        os.environ["DATABASE_URL"] = url
+        # Imported here so the engine binds to the temporary database.
+        from jobqueue.dispatcher import Dispatcher
+        from jobqueue.scheduler import FairScheduler
+
+        from .leases import leases
+
+        async def run() -> dict:
+            await _seed(url, args.flood, tenant="tenant-alice")
+            await _seed(url, args.trickle, tenant="tenant-bob")
+
+            async def fake_job(job_id: str) -> None:
+                await asyncio.sleep(args.job_seconds)
+
+            dispatcher = Dispatcher(fake_job, leases, concurrency=args.concurrency, poll_interval=0.05, scheduler=FairScheduler())
+            await dispatcher.start()
+            start = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.05)
+                if dispatcher.is_idle():
+                    break
+            elapsed = time.perf_counter() - start
+            await dispatcher.stop()
+            print(f"drained {args.flood + args.trickle} jobs in {elapsed:.2f}s")
+            return dispatcher.scheduler.all_stats()
+
+        stats = asyncio.run(run())
+    # With FIFO claiming, tenant-bob's jobs would start only after the flood.
+    fifo_wait = args.flood * args.job_seconds / args.concurrency
+    print(f"FIFO estimate for the trickling tenant: ~{fifo_wait:.2f}s wait")
+    print(f"{'tenant':<14} {'jobs':>5} {'mean':>7} {'p95':>7} {'max':>7}")
+    for tenant, s in stats.items():
+        w = s["wait_seconds"]
+        print(f"{tenant:<14} {w['samples']:>5} {w['mean']:>7.2f} {w['p95']:>7.2f} {w['max']:>7.2f}")
+
+
+def bench_batching(args: argparse.Namespace) -> None:
+    """Throughput vs. added latency of micro-batching against the mock LLM tasks."""
+    from .batching import Completion, chat_batcher
+    from .tasks import llm_chat_completion, llm_chat_completion_batch
+
+    async def run(max_size: int) -> tuple[float, list[float], int, int]:
+        calls = 0
+
+        async def single(**kwargs) -> dict:
+            nonlocal calls
+            calls += 1
+            return await llm_chat_completion.fn(**kwargs)
+
+        async def batched(model: str, batch: list[list[dict]], temperature: float) -> list[dict]:
+            nonlocal calls
+            calls += 1
+            return await llm_chat_completion_batch.fn(model, batch, temperature)
+
+        if max_size == 1:
+            call = single
+        else:
+            batcher = chat_batcher(batched, max_size=max_size, max_wait_ms=args.wait_ms)
+
+            async def call(**kwargs) -> dict:
+                return await batcher.submit(Completion(**kwargs))
+
+        sem = asyncio.Semaphore(args.concurrency)
+        latencies: list[float] = []
+        failures = 0
+
+        async def one(i: int) -> None:
+            nonlocal failures
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    await call(model="mock-gpt", messages=_request(i)["messages"], temperature=0.7)
+                except RuntimeError:
+                    failures += 1
+                latencies.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.jobs)))
+        return time.perf_counter() - start, latencies, failures, calls
+
+    # The mock provider has unlimited parallelism, so "calls" (flow runs and
+    # provider requests paid for) is where batching shows up most.
+    print(f"{'max_batch':>9} {'calls':>6} {'jobs/s':>8} {'mean_s':>7} {'p95_s':>7} {'failed':>6}")
+    for size in args.sizes:
+        elapsed, latencies, failures, calls = asyncio.run(run(size))
+        latencies.sort()
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        print(
+            f"{size:>9} {calls:>6} {args.jobs / elapsed:>8.2f} "
+            f"{statistics.fmean(latencies):>7.2f} {p95:>7.2f} {failures:>6}"
+        )
+
+
+def bench_execution(args: argparse.Namespace) -> None:
+    """Per-job orchestration overhead of each EXECUTION_MODE with a zero-latency mock LLM."""
+    # Set before tasks.py is imported so the mock adds no latency or failures of its own.
+    os.environ["MOCK_LLM_MIN_LATENCY"] = os.environ["MOCK_LLM_MAX_LATENCY"] = "0"
+    os.environ["MOCK_LLM_FAILURE_RATE"] = "0"
+    from .execution import Executor
+
+    async def run(mode: str) -> tuple[float, list[float], dict]:
+        executor = Executor(mode, batch_flow_idle_seconds=1.0)
+        sem = asyncio.Semaphore(args.concurrency)
+        latencies: list[float] = []
+
+        async def one(i: int) -> None:
+            async with sem:
+                t0 = time.perf_counter()
+                await executor.run(model="mock-gpt", messages=_request(i)["messages"], temperature=0.7)
+                latencies.append(time.perf_counter() - t0)
+
+        # Warm up Prefect (client, local server, flow registration) outside the timing.
+        await executor.run(model="mock-gpt", messages=_request(-1)["messages"], temperature=0.7)
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.jobs)))
+        return time.perf_counter() - start, latencies, executor.stats()
+
+    # The task body does no work, so per-job latency is orchestration overhead.
+    print(f"{'mode':<11} {'jobs/s':>8} {'mean_ms':>8} {'p95_ms':>8} {'flow_runs':>9}")
+    for mode in args.modes:
+        elapsed, latencies, stats = asyncio.run(run(mode))
+        latencies.sort()
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        flow_runs = stats["flow_runs"] + stats["batch_flow_runs"]
+        print(
+            f"{mode:<11} {args.jobs / elapsed:>8.1f} {statistics.fmean(latencies) * 1000:>8.1f} "
+            f"{p95 * 1000:>8.1f} {flow_runs:>9}"
+        )
+
+
+def bench_jobstate(args: argparse.Namespace) -> None:
+    """Job-state writes/sec: ORM read + two commits per job vs. coalesced conditional UPDATEs."""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite+aiosqlite:///{Path(tmp) / 'jobs.db'}"
+        os.environ["DATABASE_URL"] = url
+        # Imported here so the engine binds to the benchmark database.
+        from .database import async_session, engine
+        from .jobstate import JobStateStore
+
+        async def orm_transitions(job_id: str) -> None:
+            # The pre-JobStateStore pattern in _run_job.
+            async with async_session() as session:
+                job = await session.get(Job, job_id)
+                job.status = JobStatus.running
+                await session.commit()
+                job.status = JobStatus.completed
+                job.result = {"ok": True}
+                job.completed_at = datetime.now(timezone.utc)
+                job.lease_owner = None
+                job.lease_expires_at = None
+                await session.commit()
+
+        async def run(variant: str, flush_ms: float) -> tuple[float, int]:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+            await _seed(url, args.jobs)
+            async with async_session() as session:
+                job_ids = list(await session.scalars(select(Job.job_id)))
+
+            store = JobStateStore(flush_ms=flush_ms)
+
+            async def store_transitions(job_id: str) -> None:
+                await store.start(job_id)
+                await store.finish(job_id, JobStatus.completed, result={"ok": True})
+
+            transitions = orm_transitions if variant == "orm" else store_transitions
+            sem = asyncio.Semaphore(args.concurrency)
+
+            async def one(job_id: str) -> None:
+                async with sem:
+                    await transitions(job_id)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(job_id) for job_id in job_ids))
+            elapsed = time.perf_counter() - start
+            return elapsed, store.counters["transactions"]
+
+        async def main() -> None:
+            print(f"{engine.dialect.name}: {args.jobs} jobs, {args.concurrency} in flight, 2 writes per job")
+            print(f"{'variant':<16} {'seconds':>8} {'writes/s':>9} {'txns':>6}")
+            variants = [("orm", 0.0)] + [("store", ms) for ms in args.flush_ms]
+            for variant, flush_ms in variants:
+                elapsed, txns = await run(variant, flush_ms)
+                if variant == "orm":
+                    label, txns = "orm", 2 * args.jobs
+                else:
+                    label = f"store {flush_ms:g}ms"
+                print(f"{label:<16} {elapsed:>8.2f} {2 * args.jobs / elapsed:>9.0f} {txns:>6}")
+            await engine.dispose()
+
+        asyncio.run(main())
+
+
+# Modules the API process must not load at import time, and its startup budget.
+STARTUP_HEAVY = ("prefect",)
+STARTUP_BUDGET_MS = 2000
+STARTUP_BUDGET_MB = 96
+
+
+def bench_startup(args: argparse.Namespace) -> None:
+    """Import time and peak RSS of ``queued_llm.app`` in fresh interpreters; exits non-zero over budget."""
+    from jobqueue import startup
+
+    startup.bench_startup("queued_llm.app", STARTUP_HEAVY, args.runs, args.budget_ms, args.budget_mb)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("executors", help=bench_executors.__doc__)
+    p.add_argument("--jobs", type=int, default=60)
+    p.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--concurrency", type=int, default=4, help="Dispatcher concurrency per process")
+    p.set_defaults(func=bench_executors)
+
+    p = sub.add_parser("fairness", help=bench_fairness.__doc__)
+    p.add_argument("--flood", type=int, default=300, help="Jobs queued by the heavy tenant")
+    p.add_argument("--trickle", type=int, default=20, help="Jobs queued afterwards by the light tenant")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--job-seconds", type=float, default=0.05, help="Simulated job duration")
+    p.set_defaults(func=bench_fairness)
+
+    p = sub.add_parser("batching", help=bench_batching.__doc__)
+    p.add_argument("--jobs", type=int, default=128)
+    p.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 32], help="Max batch sizes (1 = unbatched)")
+    p.add_argument("--wait-ms", type=float, default=20)
+    p.add_argument("--concurrency", type=int, default=32, help="Jobs in flight, as with DISPATCH_CONCURRENCY")
+    p.set_defaults(func=bench_batching)
+
+    p = sub.add_parser("execution", help=bench_execution.__doc__)
+    p.add_argument("--jobs", type=int, default=200)
+    p.add_argument("--modes", nargs="+", default=["flow", "batch_flow", "direct"])
+    p.add_argument("--concurrency", type=int, default=16, help="Jobs in flight, as with DISPATCH_CONCURRENCY")
+    p.set_defaults(func=bench_execution)
+
+    p = sub.add_parser("jobstate", help=bench_jobstate.__doc__)
+    p.add_argument("--jobs", type=int, default=2000)
+    p.add_argument("--concurrency", type=int, default=64)
+    p.add_argument("--flush-ms", type=float, nargs="+", default=[0, 10, 50], help="JOBSTATE_FLUSH_MS values to try")
+    p.add_argument("--url", help="Database URL (default: temporary SQLite); the jobs table is dropped")
+    p.set_defaults(func=bench_jobstate)
+
+    p = sub.add_parser("startup", help=bench_startup.__doc__)
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="Max median import time")
+    p.add_argument("--budget-mb", type=float, default=STARTUP_BUDGET_MB, help="Max peak RSS after import")
+    p.set_defaults(func=bench_startup)
+
+    args = parser.parse_args()
+    args.func(args)
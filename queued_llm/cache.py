@@ -0,0 +1,181 @@
+"""Completion response cache with single-flight deduplication.
+
+Responses are keyed on a canonical hash of the tenant and the request (model,
+messages), so one tenant never sees another's completions. Only requests at
+``temperature == 0`` are cached: sampled completions are meant to differ
+between calls. Lookups go to an in-memory LRU + TTL tier first and then, if
+enabled, to a persistent tier in the jobs DB shared by every process. Concurrent
+misses for the same key share one in-flight execution instead of each running
+their own flow. Failed executions are never cached.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, select
+
+from .database import async_session
+from .models import CachedCompletion
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "false").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL = float(os.environ.get("CACHE_TTL", "300"))
+CACHE_PERSISTENT = os.environ.get("CACHE_PERSISTENT", "false").lower() == "true"
+
+
+def request_key(tenant_id: str, request: dict) -> str | None:
+    """Canonical SHA-256 of the tenant and the fields that determine a completion.
+
+    None for a request sampled at a non-zero temperature, which is never cached.
+    """
+    temperature = float(request.get("temperature", 0.7))
+    if temperature != 0:
+        return None
+    canonical = {
+        "tenant_id": tenant_id,
+        "model": request.get("model", "mock-gpt"),
+        "messages": [{"role": m["role"], "content": m["content"]} for m in request.get("messages", [])],
+        "temperature": temperature,
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class _LeaderCancelled(Exception):
+    """The shared execution was cancelled rather than failed; its waiters retry."""
+
+
+class CompletionCache:
+    """Two-tier LRU/TTL cache with single-flight execution."""
+
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl: float = CACHE_TTL,
+        persistent: bool = CACHE_PERSISTENT,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persistent = persistent
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.counters: Counter[str] = Counter()
+
+    async def get(self, key: str | None) -> dict | None:
+        """Return the cached response for ``key``, or None (always, for a None key)."""
+        if key is None:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, result = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return result
+            del self._entries[key]
+            self.counters["expirations"] += 1
+
+        if self.persistent:
+            result = await self._load(key)
+            if result is not None:
+                self._remember(key, result)
+                self.counters["persistent_hits"] += 1
+                return result
+
+        return None
+
+    async def get_or_compute(self, key: str | None, compute: Callable[[], Awaitable[dict]]) -> dict:
+        """Return a cached response or run ``compute``, sharing one run between concurrent callers.
+
+        ``misses`` counts actual executions; callers that join one are ``coalesced``.
+        A None key (an uncacheable request) just runs ``compute``.
+        """
+        if key is None:
+            return await compute()
+        while True:
+            result = await self.get(key)
+            if result is not None:
+                return result
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.counters["coalesced"] += 1
+            try:
+                return await asyncio.shield(inflight)
+            except _LeaderCancelled:
+                # The caller running it was cancelled; one of us takes over.
+                continue
+
+        self.counters["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            # Not future.cancel(): waiters would get CancelledError, which
+            # callers that handle Exception don't catch.
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark retrieved so a failure nobody else waited on is not logged as unhandled.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            self._remember(key, result)
+            if self.persistent:
+                try:
+                    await self._store(key, result)
+                except Exception:
+                    logger.exception("Failed to persist cached completion %s", key)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "persistent": self.persistent,
+            "inflight": len(self._inflight),
+            **{name: self.counters[name] for name in (
+                "memory_hits", "persistent_hits", "misses", "coalesced", "evictions", "expirations",
+            )},
+        }
+
+    def _remember(self, key: str, result: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    async def _load(self, key: str) -> dict | None:
+        async with async_session() as session:
+            stmt = select(CachedCompletion.result).where(
+                CachedCompletion.key == key,
+                CachedCompletion.expires_at > datetime.now(timezone.utc),
+            )
+            return await session.scalar(stmt)
+
+    async def _store(self, key: str, result: dict) -> None:
+        now = datetime.now(timezone.utc)
+        async with async_session() as session:
+            # Opportunistically drop expired rows so the table stays bounded.
+            await session.execute(delete(CachedCompletion).where(CachedCompletion.expires_at <= now))
+            await session.merge(
+                CachedCompletion(key=key, result=result, expires_at=now + timedelta(seconds=self.ttl))
+            )
+            await session.commit()
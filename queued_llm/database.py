@@ -5,6 +5,7 @@ Swap DATABASE_URL to a postgres+asyncpg:// connection string for production.
 
 import os
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 DATABASE_URL = os.environ.get(
@@ -13,6 +14,18 @@ DATABASE_URL = os.environ.get(
 )
 
 engine = create_async_engine(DATABASE_URL, echo=False)
+
+if engine.dialect.name == "sqlite":
+    # WAL lets executor processes read while another one holds the write lock.
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
@@ -0,0 +1,152 @@
+"""How a single job's chat completion is executed.
+
+``EXECUTION_MODE`` picks the trade-off between Prefect observability and
+per-job orchestration cost:
+
+- ``flow`` (default): one ``chat_completion_pipeline`` flow run per job. Every
+  job gets its own flow and task run in the Prefect UI.
+- ``batch_flow``: jobs become task runs inside a long-lived
+  ``chat_completion_job_batch`` flow run that hosts up to
+  ``EXECUTION_BATCH_FLOW_MAX_JOBS`` jobs and ends after
+  ``EXECUTION_BATCH_FLOW_IDLE_SECONDS`` without work. Per-job task state is
+  still recorded, but the flow-run bookkeeping is paid once per batch.
+- ``direct``: call the task function in-process (with the task's retry
+  policy) and skip Prefect entirely, except for a sampled
+  ``EXECUTION_TRACE_SAMPLE_RATE`` fraction of jobs that still run as full
+  flows so latency and failures stay visible in the UI.
+
+This is independent of micro-batching (batching.py), which merges several
+jobs into one provider call and always runs as a flow.
+
+Prefect and the flows are imported on the first job rather than with this
+module, so importing the API doesn't pay Prefect's startup cost.
+"""
+
+import asyncio
+import os
+import random
+from collections import Counter
+from collections.abc import Callable
+
+EXECUTION_MODES = ("flow", "batch_flow", "direct")
+EXECUTION_MODE = os.environ.get("EXECUTION_MODE", "flow")
+EXECUTION_TRACE_SAMPLE_RATE = float(os.environ.get("EXECUTION_TRACE_SAMPLE_RATE", "0.01"))
+EXECUTION_BATCH_FLOW_MAX_JOBS = int(os.environ.get("EXECUTION_BATCH_FLOW_MAX_JOBS", "500"))
+EXECUTION_BATCH_FLOW_IDLE_SECONDS = float(os.environ.get("EXECUTION_BATCH_FLOW_IDLE_SECONDS", "5"))
+
+
+class Executor:
+    """Runs chat completions according to an execution mode."""
+
+    def __init__(
+        self,
+        mode: str = EXECUTION_MODE,
+        trace_sample_rate: float = EXECUTION_TRACE_SAMPLE_RATE,
+        batch_flow_max_jobs: int = EXECUTION_BATCH_FLOW_MAX_JOBS,
+        batch_flow_idle_seconds: float = EXECUTION_BATCH_FLOW_IDLE_SECONDS,
+    ) -> None:
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"EXECUTION_MODE must be one of {', '.join(EXECUTION_MODES)}, got {mode!r}")
+        self.mode = mode
+        self.trace_sample_rate = trace_sample_rate
+        self.batch_flow_max_jobs = batch_flow_max_jobs
+        self.batch_flow_idle_seconds = batch_flow_idle_seconds
+        self.counters: Counter[str] = Counter()
+        self._inbox: asyncio.Queue[tuple[dict, asyncio.Future]] = asyncio.Queue()
+        self._host: asyncio.Task | None = None
+        self._batch_flow: Callable | None = None
+
+    async def run(self, model: str, messages: list[dict], temperature: float) -> dict:
+        """Execute one completion and return the provider response."""
+        params = {"model": model, "messages": messages, "temperature": temperature}
+        if self.mode == "batch_flow":
+            return await self._run_in_batch_flow(params)
+        if self.mode == "direct" and random.random() >= self.trace_sample_rate:
+            self.counters["direct"] += 1
+            return await self._run_direct(params)
+        from .flows import chat_completion_pipeline
+
+        self.counters["flow_runs"] += 1
+        return await chat_completion_pipeline(**params)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "trace_sample_rate": self.trace_sample_rate if self.mode == "direct" else None,
+            "batch_flow_active": self._host is not None and not self._host.done(),
+            **{name: self.counters[name] for name in ("flow_runs", "batch_flow_runs", "batch_flow_jobs", "direct")},
+        }
+
+    # -- direct -----------------------------------------------------------
+
+    async def _run_direct(self, params: dict) -> dict:
+        from .tasks import llm_chat_completion
+
+        # Task.fn bypasses Prefect's retry handling, so apply the task's policy here.
+        delay = llm_chat_completion.retry_delay_seconds
+        for attempt in range(llm_chat_completion.retries + 1):
+            try:
+                return await llm_chat_completion.fn(**params)
+            except Exception:
+                if attempt == llm_chat_completion.retries:
+                    raise
+                if isinstance(delay, (int, float)) and delay:
+                    await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    # -- batch_flow -------------------------------------------------------
+
+    async def _run_in_batch_flow(self, params: dict) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        self._inbox.put_nowait((params, future))
+        if self._host is None or self._host.done():
+            self._host = asyncio.create_task(self._host_batch_flows())
+        return await future
+
+    async def _host_batch_flows(self) -> None:
+        if self._batch_flow is None:
+            from prefect import flow
+
+            self._batch_flow = flow(name="chat_completion_job_batch")(self._drain_inbox)
+        # A job enqueued while the previous run was winding down starts a new one.
+        while not self._inbox.empty():
+            self.counters["batch_flow_runs"] += 1
+            try:
+                await self._batch_flow(self.batch_flow_max_jobs, self.batch_flow_idle_seconds)
+            except Exception as exc:
+                # The flow run itself failed (e.g. API unreachable): fail what it left behind.
+                while not self._inbox.empty():
+                    _, future = self._inbox.get_nowait()
+                    if not future.done():
+                        future.set_exception(exc)
+
+    async def _drain_inbox(self, max_jobs: int, idle_seconds: float) -> int:
+        """Run queued jobs as concurrent task runs until ``max_jobs`` or ``idle_seconds`` of quiet."""
+        from .tasks import llm_chat_completion
+
+        running: set[asyncio.Task] = set()
+
+        async def one(params: dict, future: asyncio.Future) -> None:
+            try:
+                result = await llm_chat_completion(**params)
+            except Exception as exc:
+                if not future.done():
+                    future.set_exception(exc)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+        taken = 0
+        while taken < max_jobs:
+            try:
+                params, future = await asyncio.wait_for(self._inbox.get(), idle_seconds)
+            except TimeoutError:
+                break
+            taken += 1
+            self.counters["batch_flow_jobs"] += 1
+            job = asyncio.create_task(one(params, future))
+            running.add(job)
+            job.add_done_callback(running.discard)
+        if running:
+            await asyncio.gather(*running)
+        return taken
@@ -2,7 +2,7 @@
 
 from prefect import flow
 
-from .tasks import llm_chat_completion
+from .tasks import llm_chat_completion, llm_chat_completion_batch
 
 
 @flow(name="chat_completion_pipeline")
@@ -17,3 +17,16 @@ async def chat_completion_pipeline(
         temperature=temperature,
     )
     return result
+
+
+@flow(name="chat_completion_batch_pipeline")
+async def chat_completion_batch_pipeline(
+    model: str,
+    batch: list[list[dict]],
+    temperature: float = 0.7,
+) -> list[dict]:
+    return await llm_chat_completion_batch(
+        model=model,
+        batch=batch,
+        temperature=temperature,
+    )
@@ -0,0 +1,44 @@
+"""Job state transitions for ``jobs`` rows, coalesced into batched UPDATEs.
+
+The buffering and statements live in ``jobqueue.jobstate``; this binds them to
+``Job``.
+"""
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from jobqueue import jobstate
+
+from .database import async_session
+from .models import Job
+from .schemas import JobStatus
+
+
+class JobStateStore(jobstate.JobStateStore):
+    """Coalesced ``running`` / terminal transitions of chat completion jobs."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = async_session,
+        flush_ms: float = jobstate.JOBSTATE_FLUSH_MS,
+        max_batch: int = jobstate.JOBSTATE_MAX_BATCH,
+    ) -> None:
+        super().__init__(
+            Job,
+            returning=("tenant_id", "request"),
+            finish_columns=("result", "error"),
+            session_factory=session_factory,
+            active=(JobStatus.queued, JobStatus.running),
+            running=JobStatus.running,
+            flush_ms=flush_ms,
+            max_batch=max_batch,
+        )
+
+    async def finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        result: dict | None = None,
+        error: str | None = None,
+    ) -> None:
+        """Record a running job's terminal state and release its lease."""
+        await self._finish(job_id, status, result=result, error=error)
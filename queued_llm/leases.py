@@ -0,0 +1,9 @@
+"""Lease-based claiming of ``jobs`` rows; the logic lives in ``jobqueue.leases``."""
+
+from jobqueue.leases import Leases
+
+from .database import async_session
+from .models import Job
+from .schemas import JobStatus
+
+leases = Leases(Job, async_session, active=(JobStatus.queued, JobStatus.running))
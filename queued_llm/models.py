@@ -1,7 +1,10 @@
-"""SQLAlchemy ORM model for the jobs table."""
+"""SQLAlchemy ORM models for the jobs table and the persistent completion cache."""
 
-from sqlalchemy import JSON, Column, DateTime, Enum, String, Text
+from datetime import timezone
+
+from sqlalchemy import JSON, Column, DateTime, Enum, Index, String, Text
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.types import TypeDecorator
 
 from .schemas import JobStatus
 
@@ -10,14 +13,50 @@ class Base(DeclarativeBase):
     pass
 
 
+class UTCDateTime(TypeDecorator):
+    """Timezone-aware UTC timestamp on every backend (SQLite drops tzinfo)."""
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+
 class Job(Base):
     __tablename__ = "jobs"
 
     job_id = Column(String(36), primary_key=True)
-    tenant_id = Column(String(128), nullable=False, index=True)
+    tenant_id = Column(String(128), nullable=False)
     status = Column(Enum(JobStatus), nullable=False, default=JobStatus.queued, index=True)
-    created_at = Column(String(64), nullable=False)
-    completed_at = Column(String(64), nullable=True)
+    created_at = Column(UTCDateTime, nullable=False)
+    completed_at = Column(UTCDateTime, nullable=True)
     request = Column(JSON, nullable=False)
     result = Column(JSON, nullable=True)
     error = Column(Text, nullable=True)
+    # Set while an executor holds the job; see leases.py.
+    lease_owner = Column(String(128), nullable=True)
+    lease_expires_at = Column(UTCDateTime, nullable=True)
+
+    __table_args__ = (
+        # Keyset pagination of a tenant's jobs, with and without a status filter.
+        Index("ix_jobs_tenant_created", "tenant_id", "created_at", "job_id"),
+        Index("ix_jobs_tenant_status_created", "tenant_id", "status", "created_at", "job_id"),
+    )
+
+
+class CachedCompletion(Base):
+    """Persistent tier of the completion cache (see cache.py)."""
+
+    __tablename__ = "completion_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of the canonical request
+    result = Column(JSON, nullable=False)
+    expires_at = Column(UTCDateTime, nullable=False, index=True)
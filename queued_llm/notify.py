@@ -0,0 +1,41 @@
+"""In-process job completion notifications.
+
+``_run_job`` publishes every state change here; the SSE and long-poll
+endpoints subscribe and wait on a queue instead of re-reading the DB. A job
+executed by another process (see leases.py) publishes nowhere this process can
+see, so waiters also re-check the DB every ``NOTIFY_FALLBACK_POLL`` seconds.
+"""
+
+import asyncio
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+
+NOTIFY_FALLBACK_POLL = float(os.environ.get("NOTIFY_FALLBACK_POLL", "5"))
+
+
+class JobNotifier:
+    """Fan-out of job state-change events to local subscribers."""
+
+    def __init__(self) -> None:
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+    def publish(self, job_id: str, event: dict) -> None:
+        """Deliver ``event`` (at least ``{"status": ...}``) to everyone waiting on ``job_id``."""
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(event)
+
+    @contextmanager
+    def subscribe(self, job_id: str):
+        """Yield a queue that receives ``job_id``'s events until the block exits.
+
+        Subscribe before reading the job's current state so no change is missed.
+        """
+        queue: asyncio.Queue[dict] = asyncio.Queue()
+        self._subscribers[job_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[job_id].discard(queue)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
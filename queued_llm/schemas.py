@@ -1,8 +1,9 @@
 """Pydantic schemas shared across the app."""
 
+from datetime import datetime
 from enum import Enum
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ChatMessage(BaseModel):
@@ -16,6 +17,10 @@ class ChatRequest(BaseModel):
     temperature: float = 0.7
 
 
+class BulkStatusRequest(BaseModel):
+    job_ids: list[str] = Field(min_length=1, max_length=1000)
+
+
 class JobStatus(str, Enum):
     queued = "queued"
     running = "running"
@@ -27,10 +32,20 @@ class JobResponse(BaseModel):
     job_id: str
     tenant_id: str
     status: JobStatus
-    created_at: str
-    completed_at: str | None = None
+    created_at: datetime
+    completed_at: datetime | None = None
     request: ChatRequest | dict | None = None
     result: dict | None = None
     error: str | None = None
 
     model_config = {"from_attributes": True}
+
+
+class JobPage(BaseModel):
+    """One keyset-paginated page of jobs, newest first.
+
+    With a ``fields`` projection each item only carries the requested fields.
+    """
+
+    items: list[JobResponse]
+    next_cursor: str | None = None
@@ -1,11 +1,21 @@
 """Prefect tasks for queued LLM chat completion."""
 
 import asyncio
+import os
 import random
 import time
 
 from prefect import task
 
+# Mock provider behaviour; benchmarks set latency to 0 to isolate orchestration cost.
+MOCK_LLM_MIN_LATENCY = float(os.environ.get("MOCK_LLM_MIN_LATENCY", "1.0"))
+MOCK_LLM_MAX_LATENCY = float(os.environ.get("MOCK_LLM_MAX_LATENCY", "4.0"))
+MOCK_LLM_FAILURE_RATE = float(os.environ.get("MOCK_LLM_FAILURE_RATE", "0.05"))
+
+
+def _mock_latency() -> float:
+    return MOCK_LLM_MIN_LATENCY + random.random() * (MOCK_LLM_MAX_LATENCY - MOCK_LLM_MIN_LATENCY)
+
 
 @task(name="llm_chat_completion", retries=2)
 async def llm_chat_completion(
@@ -18,14 +28,40 @@ async def llm_chat_completion(
     Simulates latency and returns a canned response based on the last user message.
     Replace the body of this function with a real API call to use in production.
     """
-    # Simulate variable LLM latency (1-4 seconds)
-    latency = 1.0 + random.random() * 3.0
+    # Simulate variable LLM latency (1-4 seconds by default)
+    latency = _mock_latency()
     await asyncio.sleep(latency)
 
-    # Simulate occasional failures (5% chance) for retry demo
-    if random.random() < 0.05:
+    # Simulate occasional failures (5% chance by default) for retry demo
+    if random.random() < MOCK_LLM_FAILURE_RATE:
         raise RuntimeError("Simulated transient LLM API error")
 
+    return _mock_response(model, messages, latency)
+
+
+@task(name="llm_chat_completion_batch", retries=2)
+async def llm_chat_completion_batch(
+    model: str,
+    batch: list[list[dict]],
+    temperature: float = 0.7,
+) -> list[dict]:
+    """Mock batched LLM chat completion task.
+
+    Runs several conversations that share a model and temperature in one
+    provider call, paying the per-call latency once. Returns one response per
+    conversation, in order. Replace with a real batch API call in production.
+    """
+    # One round trip for the whole batch, plus a little per-item decode time
+    latency = _mock_latency() + 0.01 * len(batch)
+    await asyncio.sleep(latency)
+
+    if random.random() < MOCK_LLM_FAILURE_RATE:
+        raise RuntimeError("Simulated transient LLM API error")
+
+    return [_mock_response(model, messages, latency) for messages in batch]
+
+
+def _mock_response(model: str, messages: list[dict], latency: float) -> dict:
     last_user_msg = ""
     for m in reversed(messages):
         if m.get("role") == "user":
@@ -0,0 +1,49 @@
+"""Standalone executor process that pulls jobs from the shared jobs table.
+
+Run any number of these alongside (or instead of) the API's in-process
+dispatcher; jobs are distributed between them through leases.
+
+    uv run python -m queued_llm.worker --concurrency 16
+"""
+
+import argparse
+import asyncio
+
+from jobqueue.dispatcher import DISPATCH_CONCURRENCY, Dispatcher
+from jobqueue.scheduler import FairScheduler
+from jobqueue.schema import upgrade_schema
+
+from .app import TENANT_MAX_CONCURRENCY, TENANT_WEIGHTS, _run_job, jobstate
+from .database import engine
+from .leases import leases
+from .models import Base
+
+
+async def main(concurrency: int, exit_when_idle: bool) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade_schema, Base.metadata)
+
+    dispatcher = Dispatcher(
+        _run_job,
+        leases,
+        concurrency=concurrency,
+        scheduler=FairScheduler(TENANT_WEIGHTS, TENANT_MAX_CONCURRENCY),
+    )
+    await dispatcher.start()
+    try:
+        while True:
+            await asyncio.sleep(dispatcher.poll_interval)
+            if exit_when_idle and dispatcher.is_idle():
+                break
+    finally:
+        await dispatcher.stop()
+        await jobstate.flush()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=DISPATCH_CONCURRENCY)
+    parser.add_argument("--exit-when-idle", action="store_true", help="Exit once no queued jobs remain")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.exit_when_idle))
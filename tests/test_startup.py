@@ -0,0 +1,17 @@
+"""API processes must start without the inference stack and within their budget."""
+
+import pytest
+
+from jobqueue.startup import measure_startup, over_budget
+from queued_llm import bench as queued_bench
+from vision_api import bench as vision_bench
+
+
+@pytest.mark.parametrize(
+    ("module", "bench"),
+    [("queued_llm.app", queued_bench), ("vision_api.app", vision_bench)],
+)
+def test_app_startup(module, bench):
+    startup = measure_startup(module, bench.STARTUP_HEAVY, runs=3)
+    assert startup.heavy == []
+    assert over_budget(startup, bench.STARTUP_BUDGET_MS, bench.STARTUP_BUDGET_MB) == []
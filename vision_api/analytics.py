@@ -0,0 +1,148 @@
+"""Normalized detections for analytical queries.
+
+Every completed job's detections are also written as one ``detections`` row
+per box, in the same transaction as the job's terminal state (see
+jobstate.py). Video jobs write one row per box per sampled frame (see
+video.py). Rows carry the job's ``tenant_id`` and ``created_at``. With the
+``(tenant_id, class_name, confidence)`` and ``(tenant_id, created_at)``
+indexes, ``class_counts`` answers questions like "people above 0.8 in the
+last day" in SQL, without reading the ``detections`` JSON blobs.
+
+Jobs completed before this table existed can be backfilled:
+
+    uv run python -m vision_api.analytics --backfill
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import delete, distinct, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from jobqueue.schema import upgrade_schema
+
+from .database import async_session, engine
+from .models import Base, DetectionJob, DetectionRecord
+from .schemas import JobKind, JobStatus
+
+
+def detection_rows(
+    job_id: str, tenant_id: str, created_at: datetime, detections: list[dict] | None, frame_index: int | None = None
+) -> list[dict]:
+    """``detections`` table rows for one job (or one video frame)."""
+    return [
+        {
+            "job_id": job_id,
+            "tenant_id": tenant_id,
+            "created_at": created_at,
+            "frame_index": frame_index,
+            "class_name": d["class_name"],
+            "confidence": d["confidence"],
+            "x1": d["x1"],
+            "y1": d["y1"],
+            "x2": d["x2"],
+            "y2": d["y2"],
+        }
+        for d in detections or ()
+    ]
+
+
+async def class_counts(
+    session: AsyncSession,
+    tenant_id: str,
+    class_names: list[str] | None = None,
+    min_confidence: float = 0.0,
+    max_confidence: float = 1.0,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    region: tuple[float, float, float, float] | None = None,
+) -> dict:
+    """Per-class detection counts for a tenant, filtered in SQL.
+
+    ``region`` keeps boxes that intersect the ``(x1, y1, x2, y2)`` rectangle, in
+    image pixels. ``since`` is inclusive and ``until`` exclusive, on the job's
+    ``created_at``.
+    """
+    R = DetectionRecord
+    where = [R.tenant_id == tenant_id, R.confidence >= min_confidence, R.confidence <= max_confidence]
+    if class_names:
+        where.append(R.class_name.in_(class_names))
+    if since is not None:
+        where.append(R.created_at >= since)
+    if until is not None:
+        where.append(R.created_at < until)
+    if region is not None:
+        rx1, ry1, rx2, ry2 = region
+        where += [R.x2 > rx1, R.x1 < rx2, R.y2 > ry1, R.y1 < ry2]
+
+    stmt = (
+        select(
+            R.class_name,
+            func.count().label("count"),
+            func.count(distinct(R.job_id)).label("jobs"),
+            func.avg(R.confidence).label("mean_confidence"),
+            func.max(R.confidence).label("max_confidence"),
+        )
+        .where(*where)
+        .group_by(R.class_name)
+        .order_by(func.count().desc(), R.class_name)
+    )
+    rows = (await session.execute(stmt)).all()
+    jobs = await session.scalar(select(func.count(distinct(R.job_id))).where(*where))
+    return {
+        "total": sum(row.count for row in rows),
+        "jobs": jobs or 0,
+        "classes": [
+            {
+                "class_name": row.class_name,
+                "count": row.count,
+                "jobs": row.jobs,
+                "mean_confidence": round(row.mean_confidence, 4),
+                "max_confidence": round(row.max_confidence, 4),
+            }
+            for row in rows
+        ],
+    }
+
+
+async def backfill(page_size: int = 500) -> int:
+    """Rewrite ``detections`` rows for every completed image job; returns the number of jobs."""
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade_schema, Base.metadata)
+    done = 0
+    after = ""
+    while True:
+        async with async_session() as session:
+            stmt = (
+                select(DetectionJob.job_id, DetectionJob.tenant_id, DetectionJob.created_at, DetectionJob.detections)
+                .where(
+                    DetectionJob.job_id > after,
+                    DetectionJob.status == JobStatus.completed,
+                    DetectionJob.kind == JobKind.image,
+                )
+                .order_by(DetectionJob.job_id)
+                .limit(page_size)
+            )
+            jobs = (await session.execute(stmt)).all()
+            if not jobs:
+                break
+            await session.execute(delete(DetectionRecord).where(DetectionRecord.job_id.in_([j.job_id for j in jobs])))
+            rows = [r for j in jobs for r in detection_rows(j.job_id, j.tenant_id, j.created_at, j.detections)]
+            if rows:
+                await session.execute(insert(DetectionRecord), rows)
+            await session.commit()
+        done += len(jobs)
+        after = jobs[-1].job_id
+    await engine.dispose()
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backfill", action="store_true", help="Fill the detections table from existing jobs")
+    args = parser.parse_args()
+    if args.backfill:
+        print(f"Backfilled {asyncio.run(backfill())} jobs")
+    else:
+        parser.print_help()
@@ -1,20 +1,58 @@
 """FastAPI service for queued YOLOv8 object detection with multi-tenant auth."""
 
 import asyncio
+import base64
+import os
 import uuid
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
-from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy import select
+from pydantic_core import to_json
+from sqlalchemy import func, insert, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from jobqueue.dispatcher import DISPATCH_CONCURRENCY, Dispatcher, LeasedJob
+from jobqueue.leases import new_lease
+from jobqueue.scheduler import FairScheduler
+from jobqueue.schema import upgrade_schema
+
+from .analytics import class_counts, detection_rows
+from .batching import VISION_BATCH_ENABLED, DetectionRequest, inference_batcher
 from .database import engine, get_session
-from .flows import detection_pipeline
-from .models import Base, DetectionJob
-from .schemas import JobResponse, JobStatus
-from .storage import ensure_bucket, upload_bytes
+from .dedup import DEDUP_ENABLED, content_key, dedup_stats, find_result, store_original
+from .inference import InferencePool
+from .jobstate import JobStateStore
+from .leases import leases
+from .models import Base, DetectionJob, DetectionRecord, VideoFrame, WebhookDeadLetter
+from .preprocess import stage_stats
+from .registry import registry
+from .render import render_annotated
+from .schemas import (
+    DetectionStats,
+    FramePage,
+    JobKind,
+    JobPage,
+    JobResponse,
+    JobStatus,
+    RenderMode,
+    WebhookDeadLetterResponse,
+)
+from .storage import (
+    aobject_exists,
+    astream_download,
+    aupload_bytes,
+    aupload_ref,
+    ensure_bucket,
+    key_from_url,
+    object_url,
+    release_ref,
+)
+from .uploads import UploadLimitMiddleware, spool_upload
+from .video import VIDEO_FRAME_STRIDE, VIDEO_UPLOAD_MAX_MB
+from .webhooks import UnsafeCallbackURL, WebhookSender, resolve_callback
 
 # ---------------------------------------------------------------------------
 # Auth
@@ -25,6 +63,26 @@ TOKENS: dict[str, str] = {
     "tok-bob-secret": "tenant-bob",
 }
 
+# Fair-share scheduling for executor-run jobs: a tenant's share of free
+# workers is proportional to its weight (default 1.0), and it never has more
+# than its cap of jobs running across all executors (default: uncapped).
+TENANT_WEIGHTS: dict[str, float] = {
+    "tenant-alice": 1.0,
+    "tenant-bob": 1.0,
+}
+
+TENANT_MAX_CONCURRENCY: dict[str, int] = {}
+
+# Default completion webhook per tenant, used when a job has no callback_url.
+TENANT_WEBHOOKS: dict[str, str] = {}
+
+# Per-tenant keys that sign completion webhooks, given as
+# TENANT_WEBHOOK_SECRETS="tenant-alice=...,tenant-bob=...". Tenants without one
+# can't register callbacks.
+TENANT_WEBHOOK_SECRETS: dict[str, str] = dict(
+    item.strip().split("=", 1) for item in os.environ.get("TENANT_WEBHOOK_SECRETS", "").split(",") if "=" in item
+)
+
 bearer_scheme = HTTPBearer()
 
 
@@ -45,9 +103,16 @@ async def get_tenant(
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema, Base.metadata)
     ensure_bucket()
+    if DISPATCH_IN_API:
+        await inference.start()
+        await dispatcher.start()
     yield
+    await dispatcher.stop()
+    await jobstate.flush()
+    await webhooks.close()
+    inference.shutdown()
     await engine.dispose()
 
 
@@ -56,6 +121,11 @@ app = FastAPI(
     description="Upload images for YOLOv8 detection. Results stored in DB, images in S3/MinIO.",
     lifespan=lifespan,
 )
+# Reject oversized uploads while they stream in, before the form is parsed.
+app.add_middleware(UploadLimitMiddleware, paths=("/v1/detect",))
+app.add_middleware(
+    UploadLimitMiddleware, paths=("/v1/detect/video",), max_bytes=int(VIDEO_UPLOAD_MAX_MB * 1024 * 1024)
+)
 
 
 # ---------------------------------------------------------------------------
@@ -63,42 +133,138 @@ app = FastAPI(
 # ---------------------------------------------------------------------------
 
 
-async def _run_detection(job_id: str, image_bytes: bytes, confidence: float, model_size: str) -> None:
-    from .database import async_session
+# Set to false to make API processes submit-only and leave execution to
+# standalone ``python -m vision_api.worker`` executors.
+DISPATCH_IN_API = os.environ.get("DISPATCH_IN_API", "true").lower() == "true"
 
-    async with async_session() as session:
-        job = await session.get(DetectionJob, job_id)
-        if not job:
-            return
+# Job state transitions from concurrent jobs are coalesced into batched UPDATEs.
+jobstate = JobStateStore()
 
-        job.status = JobStatus.running
-        await session.commit()
+# Finished jobs with a callback URL are POSTed there; see webhooks.py.
+webhooks = WebhookSender(TENANT_WEBHOOK_SECRETS)
 
-        try:
-            # Run the Prefect flow (sync, so offload to thread)
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None,
-                lambda: detection_pipeline(
-                    image_bytes=image_bytes,
-                    confidence_threshold=confidence,
-                    model_size=model_size,
-                ),
-            )
+# Detection flows run on the default thread pool, or in dedicated inference
+# processes with INFERENCE_PROCESSES > 0.
+inference = InferencePool()
 
-            # Upload annotated image to S3
-            annotated_key = f"{job.tenant_id}/{job_id}/annotated.jpg"
-            annotated_url = upload_bytes(annotated_key, result["annotated_image_bytes"])
+# The inference modules (flows, tiling, video) import Prefect, ultralytics/torch
+# and OpenCV, which take seconds and hundreds of MB to load. They are imported
+# on a process's first job, so submit-only API processes never load them.
 
-            job.detections = result["detections"]
-            job.annotated_image_url = annotated_url
-            job.status = JobStatus.completed
-        except Exception as exc:
-            job.error = str(exc)
-            job.status = JobStatus.failed
 
-        job.completed_at = datetime.now(timezone.utc).isoformat()
-        await session.commit()
+async def _run_batch(*args) -> list[dict]:
+    from .flows import detection_batch_pipeline
+
+    return await inference.run(detection_batch_pipeline, *args)
+
+
+# Optional batching stage: concurrent jobs with the same model_size/confidence
+# share one detection_batch_pipeline run and forward pass.
+batcher = inference_batcher(_run_batch) if VISION_BATCH_ENABLED else None
+
+
+def _annotated_key(tenant: str, job_id: str) -> str:
+    return f"{tenant}/{job_id}/annotated.jpg"
+
+
+async def _run_tiled(image_ref: str, annotated_key: str | None, confidence: float, model_size: str) -> dict:
+    from .flows import tiled_detection_pipeline
+    from .tiling import run_tiled
+
+    # Several inference processes share one image's tiles; otherwise it is one flow run.
+    if inference.processes > 1:
+        return await run_tiled(inference, image_ref, annotated_key, confidence, model_size)
+    return await inference.run(
+        tiled_detection_pipeline,
+        image_ref=image_ref,
+        annotated_key=annotated_key,
+        confidence_threshold=confidence,
+        model_size=model_size,
+    )
+
+
+# Spool files of uploads accepted by this process, by job_id, until their job
+# runs here; see create_detection.
+_spooled: dict[str, str] = {}
+
+
+async def _run_detection(job_id: str) -> None:
+    """Run detection for a leased job.
+
+    A job accepted by this process reads the spooled upload (deleted
+    afterwards); jobs claimed from the table read the original from storage.
+    """
+    image_ref = _spooled.pop(job_id, None)
+    job = await jobstate.start(job_id)
+    if job is None:
+        if image_ref:
+            release_ref(image_ref)
+        return
+
+    detections = annotated_url = error = None
+    try:
+        ref = image_ref or job.original_image_key
+        # Only eager jobs render here; lazy ones render on first GET .../annotated.
+        annotated_key = _annotated_key(job.tenant_id, job_id) if job.render == RenderMode.eager else None
+        if job.kind == JobKind.video:
+            from .video import run_video
+
+            result = await run_video(
+                inference, job, ref, job.confidence, job.model_size, job.frame_stride
+            )
+        elif job.tiled:
+            result = await _run_tiled(ref, annotated_key, job.confidence, job.model_size)
+        elif batcher:
+            result = await batcher.submit(
+                DetectionRequest(ref, annotated_key, job.confidence, job.model_size)
+            )
+            # Per-image failures come back as results, so they fail only this job.
+            if "error" in result:
+                raise RuntimeError(result["error"])
+        else:
+            from .flows import detection_pipeline
+
+            # Run the Prefect flow (sync, so offload it)
+            result = await inference.run(
+                detection_pipeline,
+                image_ref=ref,
+                annotated_key=annotated_key,
+                confidence_threshold=job.confidence,
+                model_size=job.model_size,
+            )
+
+        detections = result["detections"]
+        annotated_url = result["annotated_image_url"]
+        stage_stats.record(result.get("timings"))
+        status = JobStatus.completed
+    except Exception as exc:
+        error = str(exc)
+        status = JobStatus.failed
+    finally:
+        if image_ref:
+            release_ref(image_ref)
+
+    await jobstate.finish(
+        job_id,
+        status,
+        detections=detections,
+        annotated_image_url=annotated_url,
+        error=error,
+        records=detection_rows(job_id, job.tenant_id, job.created_at, detections),
+    )
+    if job.callback_url:
+        webhooks.submit(job_id, job.callback_url)
+
+
+# Runs this process's jobs when DISPATCH_IN_API: its own submissions (leased at
+# insert) and claims from the table, with free slots split across tenants by
+# the fair scheduler. Leases of held jobs are renewed by its heartbeat.
+dispatcher = Dispatcher(
+    _run_detection,
+    leases,
+    concurrency=DISPATCH_CONCURRENCY,
+    scheduler=FairScheduler(TENANT_WEIGHTS, TENANT_MAX_CONCURRENCY),
+)
 
 
 # ---------------------------------------------------------------------------
@@ -106,34 +272,169 @@ async def _run_detection(job_id: str, image_bytes: bytes, confidence: float, mod
 # ---------------------------------------------------------------------------
 
 
+async def _callback_url(tenant: str, callback_url: str | None) -> str | None:
+    url = callback_url or TENANT_WEBHOOKS.get(tenant)
+    if url is not None:
+        if not TENANT_WEBHOOK_SECRETS.get(tenant):
+            raise HTTPException(status_code=400, detail="No webhook signing secret is configured for this tenant")
+        try:
+            await resolve_callback(url)
+        except UnsafeCallbackURL as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        except OSError:
+            raise HTTPException(status_code=400, detail="callback_url host does not resolve")
+    return url
+
+
 @app.post("/v1/detect", status_code=202)
 async def create_detection(
     file: UploadFile = File(...),
     confidence: float = Form(0.25),
     model_size: str = Form("yolov8n"),
+    render: RenderMode = Form(RenderMode.eager),
+    tiled: bool = Form(False),
+    callback_url: str | None = Form(None, description="URL to POST the signed result to when the job finishes"),
     tenant: str = Depends(get_tenant),
     session: AsyncSession = Depends(get_session),
 ) -> dict:
     """Upload an image for object detection. Returns a job ID immediately."""
-    image_bytes = await file.read()
+    callback_url = await _callback_url(tenant, callback_url)
+    # Streamed to a spool file, never held in memory; the job reads it lazily.
+    upload = await spool_upload(file)
     job_id = str(uuid.uuid4())
 
-    # Upload original image to S3
-    ext = file.filename.rsplit(".", 1)[-1] if file.filename else "jpg"
-    original_key = f"{tenant}/{job_id}/original.{ext}"
-    original_url = upload_bytes(original_key, image_bytes, content_type=file.content_type or "image/jpeg")
-
-    job = DetectionJob(
-        job_id=job_id,
-        tenant_id=tenant,
-        status=JobStatus.queued,
-        created_at=datetime.now(timezone.utc).isoformat(),
-        original_image_url=original_url,
-    )
-    session.add(job)
-    await session.commit()
+    content_type = file.content_type or "image/jpeg"
+
+    try:
+        cached = None
+        if DEDUP_ENABLED:
+            # One stored original per tenant and image content.
+            cached = await find_result(session, tenant, upload.sha256, model_size, confidence, tiled)
+            original_key = content_key(tenant, upload.sha256)
+            original_url = await store_original(original_key, upload.ref, upload.size, content_type)
+        else:
+            # Upload original image to S3
+            ext = file.filename.rsplit(".", 1)[-1] if file.filename else "jpg"
+            original_key = f"{tenant}/{job_id}/original.{ext}"
+            original_url = await aupload_ref(original_key, upload.ref, content_type=content_type)
+
+        now = datetime.now(timezone.utc)
+        job = DetectionJob(
+            job_id=job_id,
+            tenant_id=tenant,
+            status=JobStatus.queued if cached is None else JobStatus.completed,
+            created_at=now,
+            original_image_key=original_key,
+            original_image_url=original_url,
+            image_sha256=upload.sha256,
+            image_size=upload.size,
+            confidence=confidence,
+            model_size=model_size,
+            render=render,
+            tiled=tiled,
+            callback_url=callback_url,
+        )
+        if cached is not None:
+            # Same image and parameters as an earlier job: reuse its results.
+            job.detections = cached.detections
+            # Without a stored annotated image, GET .../annotated renders one.
+            job.annotated_image_url = cached.annotated_image_url if render != RenderMode.none else None
+            job.completed_at = now
+            rows = detection_rows(job_id, tenant, now, cached.detections)
+            if rows:
+                await session.execute(insert(DetectionRecord), rows)
+        elif DISPATCH_IN_API:
+            # Run it here, leased to this process, unless executors own execution.
+            for name, value in new_lease().items():
+                setattr(job, name, value)
+        session.add(job)
+        await session.commit()
+    except BaseException:
+        release_ref(upload.ref)
+        raise
+
+    if DISPATCH_IN_API and cached is None:
+        # _run_detection deletes the spool file when it is done with it.
+        _spooled[job_id] = upload.ref
+        dispatcher.submit_leased(LeasedJob(job_id, tenant, now))
+    else:
+        release_ref(upload.ref)
+    if cached is not None and callback_url:
+        webhooks.submit(job_id, callback_url)
+    return {"job_id": job_id, "status": job.status}
+
 
-    asyncio.create_task(_run_detection(job_id, image_bytes, confidence, model_size))
+@app.post("/v1/detect/video", status_code=202)
+async def create_video_detection(
+    file: UploadFile | None = File(None),
+    source_key: str | None = Form(None, description="Object key of a video already in the bucket"),
+    confidence: float = Form(0.25),
+    model_size: str = Form("yolov8n"),
+    frame_stride: int = Form(VIDEO_FRAME_STRIDE, ge=1, description="Detect on every n-th frame"),
+    callback_url: str | None = Form(None, description="URL to POST the signed result to when the job finishes"),
+    tenant: str = Depends(get_tenant),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    """Submit a video (upload or ``source_key``) for per-frame detection. Returns a job ID immediately."""
+    if (file is None) == (source_key is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of file or source_key")
+    callback_url = await _callback_url(tenant, callback_url)
+
+    job_id = str(uuid.uuid4())
+    upload = None
+    if source_key is not None:
+        # Only objects under the tenant's own prefix.
+        if not source_key.startswith(f"{tenant}/") or not await aobject_exists(source_key):
+            raise HTTPException(status_code=404, detail="Source object not found")
+        original_key = source_key
+        original_url = object_url(source_key)
+    else:
+        upload = await spool_upload(file, max_bytes=int(VIDEO_UPLOAD_MAX_MB * 1024 * 1024))
+
+    try:
+        if upload is not None:
+            content_type = file.content_type or "video/mp4"
+            if DEDUP_ENABLED:
+                original_key = content_key(tenant, upload.sha256)
+                original_url = await store_original(original_key, upload.ref, upload.size, content_type)
+            else:
+                ext = file.filename.rsplit(".", 1)[-1] if file.filename else "mp4"
+                original_key = f"{tenant}/{job_id}/original.{ext}"
+                original_url = await aupload_ref(original_key, upload.ref, content_type=content_type)
+
+        now = datetime.now(timezone.utc)
+        job = DetectionJob(
+            job_id=job_id,
+            tenant_id=tenant,
+            status=JobStatus.queued,
+            created_at=now,
+            original_image_key=original_key,
+            original_image_url=original_url,
+            image_sha256=upload.sha256 if upload else None,
+            image_size=upload.size if upload else None,
+            confidence=confidence,
+            model_size=model_size,
+            render=RenderMode.none,
+            kind=JobKind.video,
+            frame_stride=frame_stride,
+            callback_url=callback_url,
+        )
+        if DISPATCH_IN_API:
+            for name, value in new_lease().items():
+                setattr(job, name, value)
+        session.add(job)
+        await session.commit()
+    except BaseException:
+        if upload is not None:
+            release_ref(upload.ref)
+        raise
+
+    if DISPATCH_IN_API:
+        if upload is not None:
+            _spooled[job_id] = upload.ref
+        dispatcher.submit_leased(LeasedJob(job_id, tenant, now))
+    elif upload is not None:
+        release_ref(upload.ref)
     return {"job_id": job_id, "status": job.status}
 
 
@@ -150,6 +451,72 @@ async def get_detection(
     return JobResponse.model_validate(job)
 
 
+@app.get("/v1/detections/{job_id}/annotated")
+async def get_annotated_image(
+    job_id: str,
+    tenant: str = Depends(get_tenant),
+    session: AsyncSession = Depends(get_session),
+) -> StreamingResponse:
+    """The annotated JPEG, rendered and cached in S3 on first request for lazy jobs."""
+    job = await session.get(DetectionJob, job_id)
+    if not job or job.tenant_id != tenant:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != JobStatus.completed:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status.value}")
+
+    if job.annotated_image_url:
+        key = key_from_url(job.annotated_image_url)
+    elif job.render == RenderMode.none:
+        raise HTTPException(status_code=404, detail="Job was submitted with render=none")
+    else:
+        key = _annotated_key(tenant, job_id)
+        image = await asyncio.to_thread(render_annotated, job.original_image_key, job.detections or [])
+        job.annotated_image_url = await aupload_bytes(key, image)
+        await session.commit()
+        return Response(image, media_type="image/jpeg")
+
+    return StreamingResponse(astream_download(key), media_type="image/jpeg")
+
+
+@app.get("/v1/detections/{job_id}/frames", response_model=FramePage)
+async def get_video_frames(
+    job_id: str,
+    cursor: int | None = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    tenant: str = Depends(get_tenant),
+    session: AsyncSession = Depends(get_session),
+) -> Response:
+    """Per-frame detections of a video job in frame order, readable while the job runs."""
+    job = await session.get(DetectionJob, job_id)
+    if not job or job.tenant_id != tenant:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.kind != JobKind.video:
+        raise HTTPException(status_code=400, detail="Not a video job")
+
+    stmt = select(VideoFrame.frame_index, VideoFrame.timestamp_ms, VideoFrame.detections).where(
+        VideoFrame.job_id == job_id
+    )
+    if cursor is not None:
+        stmt = stmt.where(VideoFrame.frame_index > cursor)
+    rows = (await session.execute(stmt.order_by(VideoFrame.frame_index).limit(limit + 1))).all()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if more or job.status in (JobStatus.queued, JobStatus.running):
+        # Still running: poll again from the last frame seen.
+        next_cursor = rows[-1].frame_index if rows else cursor if cursor is not None else -1
+    items = [{"frame": r.frame_index, "timestamp_ms": r.timestamp_ms, "detections": r.detections} for r in rows]
+    page = {
+        "status": job.status,
+        "frames_processed": job.frames_processed,
+        "frames_total": job.frames_total,
+        "items": items,
+        "next_cursor": next_cursor,
+    }
+    return Response(content=to_json(page), media_type="application/json")
+
+
 @app.get("/v1/detections/{job_id}/status")
 async def get_detection_status(
     job_id: str,
@@ -163,15 +530,185 @@ async def get_detection_status(
     return {"job_id": job.job_id, "status": job.status}
 
 
-@app.get("/v1/detections")
+def _encode_cursor(created_at: datetime, job_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{job_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        created_at, job_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), job_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _parse_fields(fields: str | None) -> list[str]:
+    if not fields:
+        return list(JobResponse.model_fields)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = set(names) - set(JobResponse.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return names
+
+
+@app.get("/v1/detections", response_model=JobPage)
 async def list_detections(
     status: JobStatus | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    fields: str | None = Query(None, description="Comma-separated job fields to return, e.g. job_id,status"),
     tenant: str = Depends(get_tenant),
     session: AsyncSession = Depends(get_session),
-) -> list[JobResponse]:
-    """List all detection jobs for the authenticated tenant."""
-    stmt = select(DetectionJob).where(DetectionJob.tenant_id == tenant)
+) -> Response:
+    """List detection jobs for the authenticated tenant, newest first.
+
+    Pass the returned ``next_cursor`` as ``cursor`` to get the next page. Only the
+    columns named in ``fields`` are read, so leaving out ``detections`` skips
+    the JSON blob.
+    """
+    names = _parse_fields(fields)
+    # The cursor columns are always read, even when not returned.
+    columns = dict.fromkeys([*names, "created_at", "job_id"])
+    stmt = select(*(getattr(DetectionJob, name) for name in columns)).where(DetectionJob.tenant_id == tenant)
     if status:
         stmt = stmt.where(DetectionJob.status == status)
-    result = await session.execute(stmt)
-    return [JobResponse.model_validate(r) for r in result.scalars().all()]
+    if cursor:
+        stmt = stmt.where(tuple_(DetectionJob.created_at, DetectionJob.job_id) < _decode_cursor(cursor))
+    stmt = stmt.order_by(DetectionJob.created_at.desc(), DetectionJob.job_id.desc()).limit(limit + 1)
+    rows = (await session.execute(stmt)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].job_id)
+
+    # Serialize row mappings straight to JSON in pydantic-core, skipping
+    # per-row model validation.
+    items = [{name: row._mapping[name] for name in names} for row in rows]
+    return Response(content=to_json({"items": items, "next_cursor": next_cursor}), media_type="application/json")
+
+
+def _parse_region(region: str | None) -> tuple[float, float, float, float] | None:
+    if region is None:
+        return None
+    try:
+        x1, y1, x2, y2 = (float(v) for v in region.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="region must be x1,y1,x2,y2")
+    return x1, y1, x2, y2
+
+
+@app.get("/v1/analytics/detections", response_model=DetectionStats)
+async def get_detection_stats(
+    class_name: list[str] | None = Query(None, description="Repeat to match several classes"),
+    min_confidence: float = Query(0.0, ge=0, le=1),
+    max_confidence: float = Query(1.0, ge=0, le=1),
+    since: datetime | None = Query(None, description="Jobs created at or after (ISO 8601)"),
+    until: datetime | None = Query(None, description="Jobs created before (ISO 8601)"),
+    region: str | None = Query(None, description="x1,y1,x2,y2 in pixels; counts boxes intersecting it"),
+    tenant: str = Depends(get_tenant),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    """Detection counts per class for the authenticated tenant, from the normalized detections table."""
+    return await class_counts(
+        session,
+        tenant,
+        class_names=class_name,
+        min_confidence=min_confidence,
+        max_confidence=max_confidence,
+        since=since,
+        until=until,
+        region=_parse_region(region),
+    )
+
+
+@app.get("/v1/queue")
+async def get_queue_stats(
+    tenant: str = Depends(get_tenant),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    """Queue depth, held jobs and age of the oldest waiting job for the authenticated tenant."""
+    queued, leased = await leases.tenant_counts(session)
+    oldest = await session.scalar(
+        select(func.min(DetectionJob.created_at)).where(
+            DetectionJob.tenant_id == tenant,
+            DetectionJob.status == JobStatus.queued,
+            DetectionJob.lease_owner.is_(None),
+        )
+    )
+    oldest_wait = (datetime.now(timezone.utc) - oldest).total_seconds() if oldest else 0.0
+    return {
+        "tenant_id": tenant,
+        "weight": TENANT_WEIGHTS.get(tenant, 1.0),
+        "max_concurrency": TENANT_MAX_CONCURRENCY.get(tenant),
+        "queued": queued.get(tenant, 0),
+        "leased": leased.get(tenant, 0),
+        "oldest_queued_seconds": round(oldest_wait, 3),
+        "wait_seconds": dispatcher.scheduler.stats(tenant)["wait_seconds"],
+        "dispatcher": {
+            "concurrency": dispatcher.concurrency if DISPATCH_IN_API else 0,
+            "in_flight": dispatcher.in_flight,
+            "backlog": dispatcher.backlog,
+        },
+    }
+
+
+@app.get("/v1/models")
+async def get_model_stats(tenant: str = Depends(get_tenant)) -> dict:
+    """Models resident in this process, load times and registry hit rate, plus the
+    inference pool and mean per-stage times of the jobs this process ran.
+
+    With ``INFERENCE_PROCESSES`` > 0 the models live in the pool's processes,
+    so this process's registry stays empty.
+    """
+    return {**registry.stats(), "inference": inference.stats(), "stages": stage_stats.stats()}
+
+
+@app.get("/v1/cache")
+async def get_cache_stats(tenant: str = Depends(get_tenant)) -> dict:
+    """Original-image dedup and result reuse: hit ratios and bytes saved in this process."""
+    return dedup_stats.stats()
+
+
+# ---------------------------------------------------------------------------
+# Webhooks
+# ---------------------------------------------------------------------------
+
+
+@app.get("/v1/webhooks")
+async def get_webhook_stats(tenant: str = Depends(get_tenant)) -> dict:
+    """Completion webhooks delivered, retried and dead-lettered by this process, and those in flight."""
+    return webhooks.stats()
+
+
+@app.get("/v1/webhooks/dead-letters")
+async def list_dead_letters(
+    limit: int = Query(100, ge=1, le=1000),
+    tenant: str = Depends(get_tenant),
+    session: AsyncSession = Depends(get_session),
+) -> list[WebhookDeadLetterResponse]:
+    """Webhooks that could not be delivered for the authenticated tenant, newest first."""
+    stmt = (
+        select(WebhookDeadLetter)
+        .where(WebhookDeadLetter.tenant_id == tenant)
+        .order_by(WebhookDeadLetter.created_at.desc(), WebhookDeadLetter.id.desc())
+        .limit(limit)
+    )
+    return [WebhookDeadLetterResponse.model_validate(dead) for dead in await session.scalars(stmt)]
+
+
+@app.post("/v1/webhooks/dead-letters/{dead_letter_id}/redeliver", status_code=202)
+async def redeliver_dead_letter(
+    dead_letter_id: int,
+    tenant: str = Depends(get_tenant),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    """Send a dead-lettered webhook again, with the job's current result; a new failure is dead-lettered anew."""
+    dead = await session.get(WebhookDeadLetter, dead_letter_id)
+    if not dead or dead.tenant_id != tenant:
+        raise HTTPException(status_code=404, detail="Dead letter not found")
+    await session.delete(dead)
+    await session.commit()
+    webhooks.submit(dead.job_id, dead.url)
+    return {"job_id": dead.job_id, "url": dead.url}
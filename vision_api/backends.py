@@ -0,0 +1,91 @@
+"""Inference backends for the model registry.
+
+``YOLO_BACKEND`` selects which weights the registry loads for a ``model_size``:
+
+- ``torch``: the ``{model_size}.pt`` checkpoint, run eagerly by PyTorch.
+- ``onnx``: ``{model_size}.onnx``, exported once from the checkpoint and run
+  by ONNX Runtime's CPU provider.
+- ``onnx-int8``: the ONNX export with its weights dynamically quantized to
+  8 bits by ``onnxruntime.quantization``. It is smaller and usually faster on
+  CPUs with VNNI, at some cost in accuracy.
+
+Ultralytics loads all three through ``YOLO(path)`` and returns the same
+``Results`` objects, so the detection tasks, tiling and video work unchanged.
+Exports are written to ``YOLO_EXPORT_DIR`` and reused by every later process.
+A file lock keeps several processes (an inference pool warming up) from
+exporting the same model at once. The ONNX graphs have dynamic batch and
+input shapes, so batching, tiling and ``YOLO_IMGSZ`` still apply.
+
+The ONNX backends need ``onnx`` and ``onnxruntime`` installed; ultralytics
+also uses ``onnxslim`` for the export if it is present.
+"""
+
+import fcntl
+import logging
+import os
+from contextlib import contextmanager
+
+from .preprocess import YOLO_IMGSZ
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+YOLO_BACKEND = os.environ.get("YOLO_BACKEND", "torch")
+YOLO_EXPORT_DIR = os.environ.get("YOLO_EXPORT_DIR", "./vision_api/exports")
+
+
+@contextmanager
+def _export_lock(path: str):
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _export_onnx(model_size: str, path: str) -> None:
+    from ultralytics import YOLO
+
+    exported = YOLO(f"{model_size}.pt").export(format="onnx", dynamic=True, imgsz=YOLO_IMGSZ)
+    os.replace(exported, path)
+
+
+def _quantize(source: str, path: str) -> None:
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    tmp = f"{path}.tmp"
+    # ConvInteger, which dynamic quantization emits for convolutions, only has a uint8 CPU kernel.
+    quantize_dynamic(source, tmp, weight_type=QuantType.QUInt8)
+    # Ultralytics reads class names and stride from the metadata; keep it.
+    quantized = onnx.load(tmp)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(onnx.load(source).metadata_props)
+    onnx.save(quantized, tmp)
+    os.replace(tmp, path)
+
+
+def weights_path(model_size: str, backend: str = YOLO_BACKEND) -> str:
+    """Path for ``YOLO(...)`` to load ``model_size`` with ``backend``, exporting it on first use."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown YOLO_BACKEND {backend!r}; expected one of {', '.join(BACKENDS)}")
+    if backend == "torch":
+        return f"{model_size}.pt"
+
+    os.makedirs(YOLO_EXPORT_DIR, exist_ok=True)
+    onnx_path = os.path.join(YOLO_EXPORT_DIR, f"{model_size}.onnx")
+    path = onnx_path if backend == "onnx" else os.path.join(YOLO_EXPORT_DIR, f"{model_size}-int8.onnx")
+    if os.path.exists(path):
+        return path
+
+    with _export_lock(os.path.join(YOLO_EXPORT_DIR, model_size)):
+        # Another process may have finished the export while we waited.
+        if not os.path.exists(onnx_path):
+            logger.info("Exporting %s to ONNX in %s", model_size, YOLO_EXPORT_DIR)
+            _export_onnx(model_size, onnx_path)
+        if not os.path.exists(path):
+            logger.info("Quantizing %s to INT8", model_size)
+            _quantize(onnx_path, path)
+    return path
@@ -0,0 +1,51 @@
+"""Cross-job batched inference.
+
+Concurrent jobs that share a ``(model_size, confidence)`` are collected for up
+to ``VISION_BATCH_MAX_WAIT_MS`` (or until ``VISION_BATCH_MAX_SIZE`` are
+pending) and run as one ``detection_batch_pipeline``: a single batched forward
+pass, which on CPU gives much better images/sec than one pass per image. Each
+job gets back its own detections and annotated image. Batches only fill if the
+process runs at least that many jobs at once (``WORKER_CONCURRENCY``). The
+batching itself is ``jobqueue.batching.MicroBatcher``.
+"""
+
+import os
+from collections.abc import Awaitable, Callable
+from typing import NamedTuple
+
+from jobqueue.batching import MicroBatcher
+
+VISION_BATCH_ENABLED = os.environ.get("VISION_BATCH_ENABLED", "false").lower() == "true"
+VISION_BATCH_MAX_SIZE = int(os.environ.get("VISION_BATCH_MAX_SIZE", "8"))
+VISION_BATCH_MAX_WAIT_MS = float(os.environ.get("VISION_BATCH_MAX_WAIT_MS", "25"))
+
+# run_batch(image_refs, annotated_keys, confidence_threshold, model_size) -> one
+# result dict per image. A coroutine function, so the blocking inference can run
+# wherever the caller chooses (see inference.py).
+BatchRunner = Callable[[list[str], list[str | None], float, str], Awaitable[list[dict]]]
+
+
+class DetectionRequest(NamedTuple):
+    image_ref: str
+    annotated_key: str | None
+    confidence: float
+    model_size: str
+
+
+def inference_batcher(
+    run_batch: BatchRunner,
+    max_size: int = VISION_BATCH_MAX_SIZE,
+    max_wait_ms: float = VISION_BATCH_MAX_WAIT_MS,
+) -> MicroBatcher[DetectionRequest, dict]:
+    """A batcher that sends each ``(model_size, confidence)`` group to ``run_batch``."""
+
+    async def run(requests: list[DetectionRequest]) -> list[dict]:
+        first = requests[0]
+        return await run_batch(
+            [r.image_ref for r in requests],
+            [r.annotated_key for r in requests],
+            first.confidence,
+            first.model_size,
+        )
+
+    return MicroBatcher(run, lambda r: (r.model_size, r.confidence), max_size, max_wait_ms)
@@ -0,0 +1,455 @@
+"""Local benchmarks for the vision detection service.
+
+    uv run python -m vision_api.bench registry --image photo.jpg --jobs 20
+    uv run python -m vision_api.bench batching --image photo.jpg --images 64 --sizes 1 4 8 16
+    uv run python -m vision_api.bench inference --image photo.jpg --images 64 --processes 0 2 4
+    uv run python -m vision_api.bench preprocess --image photo.jpg --runs 20 --detect
+    uv run python -m vision_api.bench tiling --image aerial.jpg --images 8 --processes 0 1 2 4 8
+    uv run python -m vision_api.bench backends --image photo.jpg --images 32 --backends torch onnx onnx-int8
+    uv run python -m vision_api.bench startup --runs 5 --budget-ms 2500 --budget-mb 128
+    S3_ENDPOINT=http://localhost:9000 uv run python -m vision_api.bench storage --uploads 200 --size-kb 512
+
+The storage benchmark writes under ``bench/`` in ``S3_BUCKET``; point it at a
+local MinIO or a moto server (``moto_server -p 9000``).
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from io import BytesIO
+
+from PIL import Image
+
+
+def _load_image(path: str | None) -> Image.Image:
+    if path:
+        return Image.open(path).convert("RGB")
+    return Image.new("RGB", (1280, 720), (120, 120, 120))
+
+
+def _summary(label: str, seconds: list[float]) -> str:
+    seconds = sorted(seconds)
+    p95 = seconds[int(0.95 * (len(seconds) - 1))]
+    return f"{label:<12} {len(seconds):>5} {statistics.fmean(seconds) * 1000:>8.1f} {p95 * 1000:>8.1f}"
+
+
+def bench_registry(args: argparse.Namespace) -> None:
+    """Per-job latency loading YOLO on every job vs. reusing it from the model registry."""
+    from ultralytics import YOLO
+
+    from .registry import ModelRegistry
+
+    img = _load_image(args.image)
+
+    reload_times = []
+    for _ in range(args.jobs):
+        start = time.perf_counter()
+        YOLO(f"{args.model_size}.pt")(img, verbose=False)
+        reload_times.append(time.perf_counter() - start)
+
+    registry = ModelRegistry()
+    registry.warm_up([args.model_size])
+    registry_times = []
+    for _ in range(args.jobs):
+        start = time.perf_counter()
+        with registry.acquire(args.model_size) as model:
+            model(img, verbose=False)
+        registry_times.append(time.perf_counter() - start)
+
+    print(f"{'mode':<12} {'jobs':>5} {'mean_ms':>8} {'p95_ms':>8}")
+    print(_summary("reload", reload_times))
+    print(_summary("registry", registry_times))
+    print(registry.stats())
+
+
+def bench_batching(args: argparse.Namespace) -> None:
+    """Images/sec through the inference batcher at different max batch sizes."""
+    from .batching import DetectionRequest, inference_batcher
+    from .registry import registry
+    from .storage import release_ref, write_local_ref
+    from .tasks import run_yolov8_detection_batch
+
+    buf = BytesIO()
+    _load_image(args.image).save(buf, format="JPEG")
+    image_ref = write_local_ref(buf.getvalue(), suffix=".jpg")
+    registry.warm_up([args.model_size])
+
+    async def run(max_size: int) -> tuple[float, list[float], int]:
+        calls = 0
+
+        async def run_batch(image_refs: list[str], annotated_keys: list, confidence: float, model_size: str) -> list[dict]:
+            nonlocal calls
+            calls += 1
+            return await asyncio.to_thread(
+                run_yolov8_detection_batch.fn, image_refs, annotated_keys, confidence, model_size
+            )
+
+        batcher = inference_batcher(run_batch, max_size=max_size, max_wait_ms=args.wait_ms)
+        # Enough jobs in flight to fill every batch, as with WORKER_CONCURRENCY >= max size.
+        sem = asyncio.Semaphore(max_size)
+        latencies: list[float] = []
+
+        async def one() -> None:
+            async with sem:
+                start = time.perf_counter()
+                # No annotated key: measure inference, not rendering and upload.
+                await batcher.submit(DetectionRequest(image_ref, None, 0.25, args.model_size))
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.images)))
+        return time.perf_counter() - start, latencies, calls
+
+    print(f"{'max_batch':>9} {'calls':>6} {'images/s':>9} {'mean_ms':>8} {'p95_ms':>8}")
+    try:
+        for size in args.sizes:
+            elapsed, latencies, calls = asyncio.run(run(size))
+            latencies.sort()
+            p95 = latencies[int(0.95 * (len(latencies) - 1))]
+            print(
+                f"{size:>9} {calls:>6} {args.images / elapsed:>9.2f} "
+                f"{statistics.fmean(latencies) * 1000:>8.1f} {p95 * 1000:>8.1f}"
+            )
+    finally:
+        release_ref(image_ref)
+
+
+def _detect(image_ref: str, model_size: str) -> dict:
+    # Module-level so inference pool processes can resolve it.
+    from .tasks import run_yolov8_detection
+
+    return run_yolov8_detection.fn(image_ref, None, 0.25, model_size)
+
+
+def bench_inference(args: argparse.Namespace) -> None:
+    """Images/sec and latency: default thread pool (0) vs. inference process pools."""
+    from .inference import InferencePool
+    from .storage import release_ref, write_local_ref
+
+    buf = BytesIO()
+    _load_image(args.image).save(buf, format="JPEG")
+    image_ref = write_local_ref(buf.getvalue(), suffix=".jpg")
+
+    async def run(processes: int) -> tuple[float, list[float]]:
+        pool = InferencePool(
+            processes=processes,
+            threads_per_process=args.threads,
+            cpu_affinity=args.affinity,
+            max_pending=args.concurrency,
+            warmup=False,
+        )
+        try:
+            await pool.start()
+            # Untimed round so every thread/process has loaded the model.
+            await asyncio.gather(*(pool.run(_detect, image_ref, args.model_size) for _ in range(max(processes, 1))))
+            latencies: list[float] = []
+
+            async def one() -> None:
+                start = time.perf_counter()
+                await pool.run(_detect, image_ref, args.model_size)
+                latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(args.images)))
+            return time.perf_counter() - start, latencies
+        finally:
+            pool.shutdown()
+
+    print(f"{args.images} images, {args.concurrency} in flight, {os.cpu_count()} CPUs")
+    print(f"{'processes':>9} {'images/s':>9} {'mean_ms':>8} {'p95_ms':>8}")
+    try:
+        for processes in args.processes:
+            elapsed, latencies = asyncio.run(run(processes))
+            latencies.sort()
+            p95 = latencies[int(0.95 * (len(latencies) - 1))]
+            print(
+                f"{processes:>9} {args.images / elapsed:>9.2f} "
+                f"{statistics.fmean(latencies) * 1000:>8.1f} {p95 * 1000:>8.1f}"
+            )
+    finally:
+        release_ref(image_ref)
+
+
+def bench_preprocess(args: argparse.Namespace) -> None:
+    """Decode + resize time: full-resolution decode vs. JPEG draft decoding, optionally with inference."""
+    from .preprocess import load_for_inference
+    from .storage import release_ref, write_local_ref
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            data = f.read()
+    else:
+        # A 12 MP frame of gradients plus noise, so the JPEG is roughly photo-sized.
+        size = (4032, 3024)
+        bands = [
+            Image.linear_gradient("L").resize(size),
+            Image.effect_noise(size, 20),
+            Image.radial_gradient("L").resize(size),
+        ]
+        buf = BytesIO()
+        Image.merge("RGB", bands).save(buf, format="JPEG", quality=90)
+        data = buf.getvalue()
+    image_ref = write_local_ref(data, suffix=".jpg")
+
+    def detect(prepared) -> tuple[float, list[tuple]]:
+        from .registry import registry
+
+        start = time.perf_counter()
+        with registry.acquire(args.model_size) as model:
+            result = model(prepared.image, conf=0.25, verbose=False)[0]
+        boxes = [prepared.rescale(*xyxy) for xyxy in result.boxes.xyxy.tolist()]
+        return (time.perf_counter() - start) * 1000, boxes
+
+    print(f"{len(data) / 1e6:.1f} MB JPEG, {args.runs} runs")
+    print(f"{'mode':<12} {'decode_ms':>10} {'resize_ms':>10} {'infer_ms':>9} {'boxes':>6}")
+    try:
+        for label, enabled in (("full", False), ("draft", True)):
+            timings: list[dict[str, float]] = []
+            infer_ms: list[float] = []
+            for _ in range(args.runs):
+                t: dict[str, float] = {}
+                prepared = load_for_inference(image_ref, t, enabled=enabled)
+                timings.append(t)
+                if args.detect:
+                    ms, boxes = detect(prepared)
+                    infer_ms.append(ms)
+            decode = statistics.fmean(t.get("decode", 0.0) for t in timings)
+            resize = statistics.fmean(t.get("resize", 0.0) for t in timings)
+            infer = f"{statistics.fmean(infer_ms):>9.1f}" if infer_ms else f"{'-':>9}"
+            count = f"{len(boxes):>6}" if args.detect else f"{'-':>6}"
+            print(f"{label:<12} {decode:>10.1f} {resize:>10.1f} {infer} {count}")
+    finally:
+        release_ref(image_ref)
+
+
+def bench_tiling(args: argparse.Namespace) -> None:
+    """Tiled detection time per large image as its tiles are spread over more inference processes."""
+    from .inference import InferencePool
+    from .storage import release_ref, write_local_ref
+    from .tiling import TILE_SIZE, run_tiled, tile_grid
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            data = f.read()
+        width, height = Image.open(BytesIO(data)).size
+    else:
+        width, height = 6000, 4000
+        buf = BytesIO()
+        Image.effect_noise((width, height), 40).convert("RGB").save(buf, format="JPEG", quality=90)
+        data = buf.getvalue()
+    image_ref = write_local_ref(data, suffix=".jpg")
+    tiles = len(tile_grid(width, height))
+
+    async def run(processes: int) -> tuple[list[float], int]:
+        pool = InferencePool(processes=processes, threads_per_process=args.threads, warmup=False)
+        try:
+            await pool.start()
+            result = await run_tiled(pool, image_ref, None, 0.25, args.model_size)  # untimed: loads models
+            latencies = []
+            for _ in range(args.images):
+                start = time.perf_counter()
+                result = await run_tiled(pool, image_ref, None, 0.25, args.model_size)
+                latencies.append(time.perf_counter() - start)
+            return latencies, len(result["detections"])
+        finally:
+            pool.shutdown()
+
+    print(f"{width}x{height} image, {tiles} tiles of {TILE_SIZE}px, {os.cpu_count()} CPUs")
+    print(f"{'processes':>9} {'images/s':>9} {'tiles/s':>8} {'mean_ms':>8} {'boxes':>6}")
+    try:
+        for processes in args.processes:
+            latencies, boxes = asyncio.run(run(processes))
+            mean = statistics.fmean(latencies)
+            print(f"{processes:>9} {1 / mean:>9.2f} {tiles / mean:>8.1f} {mean * 1000:>8.1f} {boxes:>6}")
+    finally:
+        release_ref(image_ref)
+
+
+def bench_backends(args: argparse.Namespace) -> None:
+    """Single-image latency and batched images/sec of each inference backend on the CPU."""
+    from .preprocess import YOLO_IMGSZ
+    from .registry import ModelRegistry
+
+    # Pre-resized as preprocess.py does, so only inference is timed.
+    img = _load_image(args.image)
+    img.thumbnail((YOLO_IMGSZ, YOLO_IMGSZ))
+
+    print(f"{img.width}x{img.height} input, {os.cpu_count()} CPUs, batch {args.batch}")
+    print(f"{'backend':<10} {'load_s':>7} {'mean_ms':>8} {'p95_ms':>8} {'images/s':>9} {'boxes':>6} {'classes':<}")
+    for backend in args.backends:
+        registry = ModelRegistry(backend=backend)
+        start = time.perf_counter()
+        # The first load includes the one-time export when there is no cached one.
+        registry.warm_up([args.model_size])
+        load = time.perf_counter() - start
+
+        latencies = []
+        with registry.acquire(args.model_size) as model:
+            for _ in range(args.images):
+                start = time.perf_counter()
+                result = model(img, conf=0.25, imgsz=YOLO_IMGSZ, verbose=False)[0]
+                latencies.append(time.perf_counter() - start)
+            batches = max(1, args.images // args.batch)
+            start = time.perf_counter()
+            for _ in range(batches):
+                model([img] * args.batch, conf=0.25, imgsz=YOLO_IMGSZ, verbose=False)
+            throughput = batches * args.batch / (time.perf_counter() - start)
+
+        classes = sorted(result.names[int(c)] for c in result.boxes.cls.tolist())
+        latencies.sort()
+        mean, p95 = statistics.fmean(latencies), latencies[int(0.95 * (len(latencies) - 1))]
+        print(
+            f"{backend:<10} {load:>7.2f} {mean * 1000:>8.1f} {p95 * 1000:>8.1f} {throughput:>9.1f} "
+            f"{len(classes):>6} {','.join(classes)}"
+        )
+
+
+# Modules the API process must not load at import time, and its startup budget.
+STARTUP_HEAVY = ("torch", "ultralytics", "cv2", "onnxruntime", "prefect")
+STARTUP_BUDGET_MS = 2500
+STARTUP_BUDGET_MB = 128
+
+
+def bench_startup(args: argparse.Namespace) -> None:
+    """Import time and peak RSS of ``vision_api.app`` in fresh interpreters; exits non-zero over budget."""
+    from jobqueue import startup
+
+    startup.bench_startup("vision_api.app", STARTUP_HEAVY, args.runs, args.budget_ms, args.budget_mb)
+
+
+def bench_storage(args: argparse.Namespace) -> None:
+    """Uploads/sec and event-loop stall: per-call client vs. pooled client vs. async wrappers."""
+    import boto3
+    from botocore.config import Config
+
+    from . import storage
+
+    storage.ensure_bucket()
+    payload = os.urandom(args.size_kb * 1024)
+
+    def per_call_client_upload(key: str) -> None:
+        # The previous storage layer: a new client for every request.
+        s3 = boto3.client(
+            "s3",
+            endpoint_url=storage.S3_ENDPOINT,
+            aws_access_key_id=storage.S3_ACCESS_KEY,
+            aws_secret_access_key=storage.S3_SECRET_KEY,
+            region_name=storage.S3_REGION,
+            config=Config(signature_version="s3v4"),
+        )
+        s3.put_object(Bucket=storage.S3_BUCKET, Key=key, Body=payload, ContentType="application/octet-stream")
+
+    async def run(variant: str) -> tuple[float, float, float]:
+        # A ticker that should wake every 5ms; any extra delay is time the loop was blocked.
+        lags: list[float] = []
+        running = True
+
+        async def monitor() -> None:
+            while running:
+                t0 = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(max(0.0, time.perf_counter() - t0 - 0.005))
+
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def one(i: int) -> None:
+            key = f"bench/{variant}/{i}"
+            async with sem:
+                if variant == "per-call":
+                    per_call_client_upload(key)
+                elif variant == "pooled":
+                    storage.upload_bytes(key, payload, "application/octet-stream")
+                else:
+                    await storage.aupload_bytes(key, payload, "application/octet-stream")
+
+        ticker = asyncio.create_task(monitor())
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.uploads)))
+        elapsed = time.perf_counter() - start
+        running = False
+        await ticker
+        return elapsed, max(lags), sum(lags)
+
+    print(f"{args.uploads} uploads of {args.size_kb} KB, {args.concurrency} in flight")
+    print(f"{'variant':<9} {'uploads/s':>10} {'max_stall_ms':>13} {'stalled_s':>10}")
+    for variant in ("per-call", "pooled", "async"):
+        elapsed, max_stall, stalled = asyncio.run(run(variant))
+        print(f"{variant:<9} {args.uploads / elapsed:>10.1f} {max_stall * 1000:>13.1f} {stalled:>10.2f}")
+
+    if args.large_mb:
+        big = os.urandom(args.large_mb * 1024 * 1024)
+        start = time.perf_counter()
+        storage.upload_bytes("bench/large", big, "application/octet-stream")
+        elapsed = time.perf_counter() - start
+        print(f"{args.large_mb} MB multipart upload: {elapsed:.2f}s ({args.large_mb / elapsed:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("registry", help=bench_registry.__doc__)
+    p.add_argument("--image", help="Image to detect on (default: a blank 1280x720 frame)")
+    p.add_argument("--jobs", type=int, default=20)
+    p.add_argument("--model-size", default="yolov8n")
+    p.set_defaults(func=bench_registry)
+
+    p = sub.add_parser("batching", help=bench_batching.__doc__)
+    p.add_argument("--image", help="Image to detect on (default: a blank 1280x720 frame)")
+    p.add_argument("--images", type=int, default=64)
+    p.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 8, 16], help="Max batch sizes (1 = unbatched)")
+    p.add_argument("--wait-ms", type=float, default=25)
+    p.add_argument("--model-size", default="yolov8n")
+    p.set_defaults(func=bench_batching)
+
+    p = sub.add_parser("inference", help=bench_inference.__doc__)
+    p.add_argument("--image", help="Image to detect on (default: a blank 1280x720 frame)")
+    p.add_argument("--images", type=int, default=64)
+    p.add_argument("--processes", type=int, nargs="+", default=[0, 2, 4], help="Pool sizes (0 = default executor)")
+    p.add_argument("--threads", type=int, default=0, help="Torch threads per process (0 = cores / processes)")
+    p.add_argument("--affinity", action="store_true", help="Pin each process to its own CPUs")
+    p.add_argument("--concurrency", type=int, default=8, help="Requests in flight (INFERENCE_MAX_PENDING)")
+    p.add_argument("--model-size", default="yolov8n")
+    p.set_defaults(func=bench_inference)
+
+    p = sub.add_parser("preprocess", help=bench_preprocess.__doc__)
+    p.add_argument("--image", help="JPEG to decode (default: a synthetic 12 MP photo)")
+    p.add_argument("--runs", type=int, default=20)
+    p.add_argument("--detect", action="store_true", help="Also run the model and count boxes")
+    p.add_argument("--model-size", default="yolov8n")
+    p.set_defaults(func=bench_preprocess)
+
+    p = sub.add_parser("tiling", help=bench_tiling.__doc__)
+    p.add_argument("--image", help="Large image to detect on (default: a synthetic 6000x4000 frame)")
+    p.add_argument("--images", type=int, default=8, help="Timed runs per pool size")
+    p.add_argument("--processes", type=int, nargs="+", default=[0, 1, 2, 4], help="Pool sizes (0 = default executor)")
+    p.add_argument("--threads", type=int, default=0, help="Torch threads per process (0 = cores / processes)")
+    p.add_argument("--model-size", default="yolov8n")
+    p.set_defaults(func=bench_tiling)
+
+    p = sub.add_parser("backends", help=bench_backends.__doc__)
+    p.add_argument("--image", help="Image to detect on (default: a blank 1280x720 frame)")
+    p.add_argument("--images", type=int, default=32, help="Timed runs per backend")
+    p.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    p.add_argument("--batch", type=int, default=8, help="Images per forward pass for the images/s column")
+    p.add_argument("--model-size", default="yolov8n")
+    p.set_defaults(func=bench_backends)
+
+    p = sub.add_parser("startup", help=bench_startup.__doc__)
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="Max median import time")
+    p.add_argument("--budget-mb", type=float, default=STARTUP_BUDGET_MB, help="Max peak RSS after import")
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser("storage", help=bench_storage.__doc__)
+    p.add_argument("--uploads", type=int, default=200)
+    p.add_argument("--size-kb", type=int, default=512)
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--large-mb", type=int, default=0, help="Also time one multipart upload of this size")
+    p.set_defaults(func=bench_storage)
+
+    args = parser.parse_args()
+    args.func(args)
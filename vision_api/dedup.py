@@ -0,0 +1,86 @@
+"""Content-addressed originals and detection result reuse.
+
+Uploads are identified by the SHA-256 computed while they stream in (see
+uploads.py). With ``DEDUP_ENABLED``, a tenant's original is stored once under
+``{tenant}/originals/{sha256}`` and re-uploads of the same bytes skip the PUT.
+A request whose ``(sha256, model_size, confidence, tiled)`` matches one of the
+tenant's completed jobs is answered from that job: the new job is inserted
+already ``completed`` with the earlier ``detections`` and
+``annotated_image_url``, and no inference runs. Both caches are scoped to the
+tenant, like the stored images themselves.
+"""
+
+import os
+from collections import Counter
+
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import DetectionJob
+from .schemas import JobKind, JobStatus
+from .storage import aobject_exists, aupload_ref, object_url
+
+DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "true").lower() == "true"
+
+
+def content_key(tenant: str, sha256: str) -> str:
+    return f"{tenant}/originals/{sha256}"
+
+
+class DedupStats:
+    """Per-process hit and bytes-saved counters."""
+
+    def __init__(self) -> None:
+        self.counters: Counter[str] = Counter()
+
+    def stats(self) -> dict:
+        c = self.counters
+        return {
+            "enabled": DEDUP_ENABLED,
+            "uploads": c["uploads"],
+            "original_hits": c["original_hits"],
+            "original_hit_ratio": round(c["original_hits"] / c["uploads"], 3) if c["uploads"] else None,
+            "result_hits": c["result_hits"],
+            "result_hit_ratio": round(c["result_hits"] / c["uploads"], 3) if c["uploads"] else None,
+            "bytes_uploaded": c["bytes_uploaded"],
+            "bytes_saved": c["bytes_saved"],
+        }
+
+
+dedup_stats = DedupStats()
+
+
+async def find_result(
+    session: AsyncSession, tenant: str, sha256: str, model_size: str, confidence: float, tiled: bool = False
+) -> Row | None:
+    """The newest completed ``(detections, annotated_image_url)`` for this image and parameters."""
+    stmt = (
+        select(DetectionJob.detections, DetectionJob.annotated_image_url)
+        .where(
+            DetectionJob.tenant_id == tenant,
+            DetectionJob.image_sha256 == sha256,
+            DetectionJob.model_size == model_size,
+            DetectionJob.confidence == confidence,
+            DetectionJob.tiled == tiled,
+            DetectionJob.kind == JobKind.image,
+            DetectionJob.status == JobStatus.completed,
+        )
+        .order_by(DetectionJob.completed_at.desc())
+        .limit(1)
+    )
+    row = (await session.execute(stmt)).first()
+    if row is not None:
+        dedup_stats.counters["result_hits"] += 1
+    return row
+
+
+async def store_original(key: str, ref: str, size: int, content_type: str) -> str:
+    """Upload the spooled original to ``key`` unless an identical object is already there."""
+    dedup_stats.counters["uploads"] += 1
+    if await aobject_exists(key):
+        dedup_stats.counters["original_hits"] += 1
+        dedup_stats.counters["bytes_saved"] += size
+        return object_url(key)
+    dedup_stats.counters["bytes_uploaded"] += size
+    return await aupload_ref(key, ref, content_type=content_type)
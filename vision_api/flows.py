@@ -1,18 +1,54 @@
-"""Prefect flow for the detection pipeline."""
+"""Prefect flow for the detection pipeline.
+
+Images cross the flow boundary as storage references (object keys or local
+``file://`` paths), never as bytes.
+"""
 
 from prefect import flow
 
-from .tasks import run_yolov8_detection
+from .tasks import run_yolov8_detection, run_yolov8_detection_batch, run_yolov8_tiled_detection
 
 
 @flow(name="detection_pipeline")
 def detection_pipeline(
-    image_bytes: bytes,
+    image_ref: str,
+    annotated_key: str | None = None,
     confidence_threshold: float = 0.25,
     model_size: str = "yolov8n",
 ) -> dict:
     return run_yolov8_detection(
-        image_bytes=image_bytes,
+        image_ref=image_ref,
+        annotated_key=annotated_key,
+        confidence_threshold=confidence_threshold,
+        model_size=model_size,
+    )
+
+
+@flow(name="tiled_detection_pipeline")
+def tiled_detection_pipeline(
+    image_ref: str,
+    annotated_key: str | None = None,
+    confidence_threshold: float = 0.25,
+    model_size: str = "yolov8n",
+) -> dict:
+    return run_yolov8_tiled_detection(
+        image_ref=image_ref,
+        annotated_key=annotated_key,
+        confidence_threshold=confidence_threshold,
+        model_size=model_size,
+    )
+
+
+@flow(name="detection_batch_pipeline")
+def detection_batch_pipeline(
+    image_refs: list[str],
+    annotated_keys: list[str | None],
+    confidence_threshold: float = 0.25,
+    model_size: str = "yolov8n",
+) -> list[dict]:
+    return run_yolov8_detection_batch(
+        image_refs=image_refs,
+        annotated_keys=annotated_keys,
         confidence_threshold=confidence_threshold,
         model_size=model_size,
     )
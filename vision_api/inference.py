@@ -0,0 +1,168 @@
+"""Where blocking inference runs.
+
+By default (``INFERENCE_PROCESSES=0``) detection flows run on the event
+loop's default thread pool, as before. With ``INFERENCE_PROCESSES=N`` they
+run in a dedicated pool of N worker processes instead. Each process holds its
+own model registry (warmed up when it starts) and uses
+``INFERENCE_THREADS_PER_PROCESS`` torch intra-op threads, by default an equal
+share of the cores. With ``INFERENCE_CPU_AFFINITY`` each process is pinned
+to its own slice of CPUs. Torch, PIL decode and JPEG encode then no longer
+compete with each other and the event loop for one GIL. At most
+``INFERENCE_MAX_PENDING`` calls are submitted at once; further callers wait.
+
+If a pool process dies (killed by the OOM killer, a segfault in a native
+library), the calls it was running or had queued fail and the pool is
+replaced with a fresh one, so later calls run normally.
+"""
+
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_PROCESSES = int(os.environ.get("INFERENCE_PROCESSES", "0"))
+INFERENCE_THREADS_PER_PROCESS = int(os.environ.get("INFERENCE_THREADS_PER_PROCESS", "0"))
+INFERENCE_CPU_AFFINITY = os.environ.get("INFERENCE_CPU_AFFINITY", "false").lower() == "true"
+INFERENCE_MAX_PENDING = int(os.environ.get("INFERENCE_MAX_PENDING", "64"))
+
+
+def _init_worker(threads: int, cpu_slots, warmup: bool) -> None:
+    # Runs once in each pool process, before torch is imported there.
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if cpu_slots is not None:
+        cpus = cpu_slots.get()
+        os.sched_setaffinity(0, cpus)
+    import torch
+
+    torch.set_num_threads(threads)
+    if warmup:
+        from .registry import registry
+
+        registry.warm_up()
+
+
+def _call(module: str, name: str, args: tuple, kwargs: dict):
+    return getattr(importlib.import_module(module), name)(*args, **kwargs)
+
+
+def _address(fn: Callable) -> tuple[str, str]:
+    # Prefect flows and tasks are resolved by the module attribute that holds them.
+    target = getattr(fn, "fn", fn)
+    return target.__module__, target.__name__
+
+
+class InferencePool:
+    """Runs blocking inference calls in the default executor or a process pool."""
+
+    def __init__(
+        self,
+        processes: int = INFERENCE_PROCESSES,
+        threads_per_process: int = INFERENCE_THREADS_PER_PROCESS,
+        cpu_affinity: bool = INFERENCE_CPU_AFFINITY,
+        max_pending: int = INFERENCE_MAX_PENDING,
+        warmup: bool = True,
+    ) -> None:
+        self.processes = processes
+        cpus = os.cpu_count() or 1
+        self.threads_per_process = threads_per_process or max(1, cpus // max(processes, 1))
+        self.cpu_affinity = cpu_affinity and processes > 0 and hasattr(os, "sched_setaffinity")
+        self.max_pending = max_pending
+        self.warmup = warmup
+        self._pool: ProcessPoolExecutor | None = None
+        self._starting = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max_pending)
+        self.pending = 0
+        self.restarts = 0
+
+    async def start(self) -> None:
+        """Warm up the models: in this process, or in each started worker process."""
+        if not self.processes:
+            if self.warmup:
+                from .registry import registry
+
+                await asyncio.to_thread(registry.warm_up)
+            return
+        async with self._starting:
+            if self._pool is None:
+                await self._start_pool()
+
+    async def _start_pool(self) -> None:
+        ctx = multiprocessing.get_context("spawn")
+        cpu_slots = None
+        if self.cpu_affinity:
+            cpus = sorted(os.sched_getaffinity(0))
+            per = max(1, len(cpus) // self.processes)
+            cpu_slots = ctx.Queue()
+            for i in range(self.processes):
+                cpu_slots.put(set(cpus[i * per:(i + 1) * per]) or {cpus[i % len(cpus)]})
+        pool = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self.threads_per_process, cpu_slots, self.warmup),
+        )
+        loop = asyncio.get_running_loop()
+        # Spawning is lazy; a round of no-op calls brings every process up.
+        await asyncio.gather(*(loop.run_in_executor(pool, os.getpid) for _ in range(self.processes)))
+        self._pool = pool
+        logger.info(
+            "Inference pool: %d processes x %d threads%s",
+            self.processes, self.threads_per_process, ", pinned" if self.cpu_affinity else "",
+        )
+
+    async def _replace(self, broken: ProcessPoolExecutor) -> None:
+        async with self._starting:
+            # Every call that was on the broken pool ends up here; replace it once.
+            if self._pool is not broken:
+                return
+            self._pool = None
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.restarts += 1
+            logger.warning("Inference pool process died; starting a new pool")
+            await self._start_pool()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, fn: Callable, /, *args, **kwargs):
+        """Call ``fn(*args, **kwargs)`` off the event loop and return its result.
+
+        In a process pool ``fn`` must be a module-level function, flow or task,
+        and its arguments and result must be picklable.
+        """
+        async with self._slots:
+            self.pending += 1
+            try:
+                loop = asyncio.get_running_loop()
+                if not self.processes:
+                    return await loop.run_in_executor(None, partial(fn, *args, **kwargs))
+                if self._pool is None:
+                    await self.start()
+                pool = self._pool
+                module, name = _address(fn)
+                try:
+                    return await loop.run_in_executor(pool, _call, module, name, args, kwargs)
+                except BrokenProcessPool:
+                    await self._replace(pool)
+                    raise
+            finally:
+                self.pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "processes": self.processes,
+            "threads_per_process": self.threads_per_process if self.processes else None,
+            "cpu_affinity": self.cpu_affinity,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "restarts": self.restarts,
+        }
@@ -0,0 +1,80 @@
+"""Job state transitions for ``detection_jobs`` rows, coalesced into batched UPDATEs.
+
+The buffering and statements live in ``jobqueue.jobstate``. Here a finish also
+replaces the job's rows in the normalized ``detections`` table (see
+analytics.py) in the same transaction.
+"""
+
+from typing import Any
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from jobqueue import jobstate
+
+from .database import async_session
+from .models import DetectionJob, DetectionRecord
+from .schemas import JobStatus
+
+
+class JobStateStore(jobstate.JobStateStore):
+    """Coalesced ``running`` / terminal transitions of detection jobs.
+
+    ``start`` returns a ``(tenant_id, created_at, original_image_key, confidence,
+    model_size, render, tiled, kind, frame_stride, callback_url)`` row.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = async_session,
+        flush_ms: float = jobstate.JOBSTATE_FLUSH_MS,
+        max_batch: int = jobstate.JOBSTATE_MAX_BATCH,
+    ) -> None:
+        super().__init__(
+            DetectionJob,
+            returning=(
+                "tenant_id",
+                "created_at",
+                "original_image_key",
+                "confidence",
+                "model_size",
+                "render",
+                "tiled",
+                "kind",
+                "frame_stride",
+                "callback_url",
+            ),
+            finish_columns=("detections", "annotated_image_url", "error"),
+            session_factory=session_factory,
+            active=(JobStatus.queued, JobStatus.running),
+            running=JobStatus.running,
+            flush_ms=flush_ms,
+            max_batch=max_batch,
+        )
+
+    async def finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        detections: list[dict] | None = None,
+        annotated_image_url: str | None = None,
+        error: str | None = None,
+        records: list[dict] | None = None,
+    ) -> None:
+        """Record a running job's terminal state and release its lease.
+
+        ``records`` (from ``analytics.detection_rows``) replace the job's rows in
+        the ``detections`` table in the same transaction.
+        """
+        await self._finish(
+            job_id, status, records, detections=detections, annotated_image_url=annotated_image_url, error=error
+        )
+
+    async def _write_finished(self, session: AsyncSession, finished: list[tuple[str, Any]]) -> None:
+        indexed = [(job_id, records) for job_id, records in finished if records]
+        if indexed:
+            # Replace rather than append, so a re-finished job is not counted twice.
+            await session.execute(
+                delete(DetectionRecord).where(DetectionRecord.job_id.in_([job_id for job_id, _ in indexed]))
+            )
+            await session.execute(insert(DetectionRecord), [r for _, records in indexed for r in records])
@@ -0,0 +1,9 @@
+"""Lease-based claiming of ``detection_jobs`` rows; the logic lives in ``jobqueue.leases``."""
+
+from jobqueue.leases import Leases
+
+from .database import async_session
+from .models import DetectionJob
+from .schemas import JobStatus
+
+leases = Leases(DetectionJob, async_session, active=(JobStatus.queued, JobStatus.running))
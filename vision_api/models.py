@@ -1,24 +1,123 @@
 """SQLAlchemy ORM models for vision detection jobs."""
 
-from sqlalchemy import JSON, Column, Enum, String, Text
+from datetime import timezone
+
+from sqlalchemy import JSON, Boolean, Column, DateTime, Enum, Float, Index, Integer, String, Text
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.types import TypeDecorator
 
-from .schemas import JobStatus
+from .schemas import JobKind, JobStatus, RenderMode
 
 
 class Base(DeclarativeBase):
     pass
 
 
+class UTCDateTime(TypeDecorator):
+    """Timezone-aware UTC timestamp on every backend (SQLite drops tzinfo)."""
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+
 class DetectionJob(Base):
     __tablename__ = "detection_jobs"
 
     job_id = Column(String(36), primary_key=True)
-    tenant_id = Column(String(128), nullable=False, index=True)
+    tenant_id = Column(String(128), nullable=False)
     status = Column(Enum(JobStatus), nullable=False, default=JobStatus.queued, index=True)
-    created_at = Column(String(64), nullable=False)
-    completed_at = Column(String(64), nullable=True)
+    created_at = Column(UTCDateTime, nullable=False)
+    completed_at = Column(UTCDateTime, nullable=True)
+    original_image_key = Column(Text, nullable=True)
     original_image_url = Column(Text, nullable=True)
+    # SHA-256 and size of the uploaded image, computed while it was spooled.
+    image_sha256 = Column(String(64), nullable=True)
+    image_size = Column(Integer, nullable=True)
     annotated_image_url = Column(Text, nullable=True)
     detections = Column(JSON, nullable=True)  # list of {class_name, confidence, x1, y1, x2, y2}
     error = Column(Text, nullable=True)
+    # Job parameters, persisted so any executor can run the job.
+    confidence = Column(Float, nullable=False, default=0.25)
+    model_size = Column(String(32), nullable=False, default="yolov8n")
+    render = Column(Enum(RenderMode), nullable=False, default=RenderMode.eager)
+    tiled = Column(Boolean, nullable=False, default=False)  # see tiling.py
+    # Video jobs (see video.py): detections live in video_frames, not in ``detections``.
+    kind = Column(Enum(JobKind), nullable=False, default=JobKind.image)
+    frame_stride = Column(Integer, nullable=True)
+    frames_processed = Column(Integer, nullable=True)
+    frames_total = Column(Integer, nullable=True)  # estimated from the container header
+    # POSTed the result once the job finishes; see webhooks.py.
+    callback_url = Column(Text, nullable=True)
+    # Set while an executor holds the job; see leases.py.
+    lease_owner = Column(String(128), nullable=True)
+    lease_expires_at = Column(UTCDateTime, nullable=True)
+
+    __table_args__ = (
+        # Keyset pagination of a tenant's jobs, with and without a status filter.
+        Index("ix_detection_jobs_tenant_created", "tenant_id", "created_at", "job_id"),
+        Index("ix_detection_jobs_tenant_status_created", "tenant_id", "status", "created_at", "job_id"),
+        # Result reuse for re-uploaded images; see dedup.py.
+        Index("ix_detection_jobs_tenant_image", "tenant_id", "image_sha256"),
+    )
+
+
+class VideoFrame(Base):
+    """Detections for one sampled frame of a video job."""
+
+    __tablename__ = "video_frames"
+
+    job_id = Column(String(36), primary_key=True)
+    frame_index = Column(Integer, primary_key=True)
+    timestamp_ms = Column(Float, nullable=True)
+    detections = Column(JSON, nullable=False)  # list of {class_name, confidence, x1, y1, x2, y2}
+
+
+class DetectionRecord(Base):
+    """One detected box, normalized out of ``detections`` JSON for queries; see analytics.py."""
+
+    __tablename__ = "detections"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String(36), nullable=False, index=True)
+    tenant_id = Column(String(128), nullable=False)
+    created_at = Column(UTCDateTime, nullable=False)  # the job's
+    frame_index = Column(Integer, nullable=True)  # video jobs only
+    class_name = Column(String(128), nullable=False)
+    confidence = Column(Float, nullable=False)
+    x1 = Column(Float, nullable=False)
+    y1 = Column(Float, nullable=False)
+    x2 = Column(Float, nullable=False)
+    y2 = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_detections_tenant_class_confidence", "tenant_id", "class_name", "confidence"),
+        Index("ix_detections_tenant_created", "tenant_id", "created_at"),
+    )
+
+
+class WebhookDeadLetter(Base):
+    """A completion webhook that could not be delivered; see webhooks.py."""
+
+    __tablename__ = "webhook_dead_letters"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String(36), nullable=False)
+    tenant_id = Column(String(128), nullable=False)
+    url = Column(Text, nullable=False)
+    event = Column(String(32), nullable=False)
+    attempts = Column(Integer, nullable=False)
+    status_code = Column(Integer, nullable=True)  # of the last attempt, if it got a response
+    error = Column(Text, nullable=True)
+    created_at = Column(UTCDateTime, nullable=False)
+
+    __table_args__ = (Index("ix_webhook_dead_letters_tenant_created", "tenant_id", "created_at"),)
@@ -0,0 +1,101 @@
+"""Image preprocessing for inference, with per-stage timings.
+
+Ultralytics resizes every image to ``YOLO_IMGSZ`` (640) on its long side, so
+fully decoding a 12-24 MP photo mostly produces pixels that are thrown away.
+With ``PREPROCESS_ENABLED`` (the default), JPEGs are decoded in PIL's draft
+mode. libjpeg then decodes at 1/2, 1/4 or 1/8 scale, the smallest that still
+covers the model input. The result is resized once to ``YOLO_IMGSZ``.
+Detections are mapped back to original image coordinates with
+``Prepared.rescale``.
+
+Tasks report per-image stage times in milliseconds (decode, resize, infer,
+postprocess, encode). ``stage_stats`` aggregates them in the API or executor
+process.
+"""
+
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from PIL import Image
+
+from .storage import open_ref
+
+PREPROCESS_ENABLED = os.environ.get("PREPROCESS_ENABLED", "true").lower() == "true"
+YOLO_IMGSZ = int(os.environ.get("YOLO_IMGSZ", "640"))
+
+STAGES = ("decode", "resize", "infer", "postprocess", "encode")
+
+
+@contextmanager
+def timed(timings: dict[str, float], stage: str):
+    """Add the block's wall time in ms to ``timings[stage]``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+
+class Prepared(NamedTuple):
+    image: Image.Image  # RGB, long side at most ``imgsz`` when preprocessed
+    width: int  # original dimensions
+    height: int
+
+    def rescale(self, x1: float, y1: float, x2: float, y2: float) -> tuple[float, float, float, float]:
+        """Map a box on ``image`` to original image coordinates."""
+        sx = self.width / self.image.width
+        sy = self.height / self.image.height
+        return (
+            min(max(x1 * sx, 0.0), self.width),
+            min(max(y1 * sy, 0.0), self.height),
+            min(max(x2 * sx, 0.0), self.width),
+            min(max(y2 * sy, 0.0), self.height),
+        )
+
+
+def load_for_inference(
+    image_ref: str, timings: dict[str, float], imgsz: int = YOLO_IMGSZ, enabled: bool = PREPROCESS_ENABLED
+) -> Prepared:
+    """Decode the referenced image at (close to) model input size."""
+    with timed(timings, "decode"), open_ref(image_ref) as fp:
+        img = Image.open(fp)
+        width, height = img.size
+        scale = imgsz / max(width, height)
+        if enabled and scale < 1:
+            # Only JPEG supports draft mode; other formats ignore it and decode fully.
+            img.draft("RGB", (round(width * scale), round(height * scale)))
+        img = img.convert("RGB")
+
+    if enabled and scale < 1:
+        with timed(timings, "resize"):
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            if img.size != size:
+                img = img.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return Prepared(img, width, height)
+
+
+class StageStats:
+    """Per-process totals of the stage timings reported by detection tasks."""
+
+    def __init__(self) -> None:
+        self.totals: Counter[str] = Counter()
+        self.images = 0
+
+    def record(self, timings: dict[str, float] | None) -> None:
+        if timings:
+            self.images += 1
+            self.totals.update(timings)
+
+    def stats(self) -> dict:
+        return {
+            "preprocess_enabled": PREPROCESS_ENABLED,
+            "imgsz": YOLO_IMGSZ,
+            "images": self.images,
+            "mean_ms": {s: round(self.totals[s] / self.images, 2) if self.images else None for s in STAGES},
+        }
+
+
+stage_stats = StageStats()
@@ -0,0 +1,131 @@
+"""Process-wide YOLO model registry.
+
+Loading ``YOLO(f"{model_size}.pt")`` reads the weights from disk and rebuilds
+the network, which for small models costs more than the inference itself. The
+registry loads each ``model_size`` once per process, keeps models in LRU order
+and evicts the least recently used once their estimated size exceeds
+``YOLO_MODEL_MEMORY_MB``. ``YOLO_WARMUP_MODELS`` are loaded and run once on a
+blank image at startup so the first job doesn't pay for it.
+
+Weights come from the configured inference backend (``YOLO_BACKEND``, see
+backends.py): the PyTorch checkpoint or a cached ONNX export of it.
+
+Ultralytics models are not safe to call from several threads at once, so
+``acquire`` holds a per-model lock for the duration of the ``with`` block.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+from PIL import Image
+
+from .backends import YOLO_BACKEND, weights_path
+
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+
+logger = logging.getLogger(__name__)
+
+YOLO_WARMUP_MODELS = [m for m in os.environ.get("YOLO_WARMUP_MODELS", "yolov8n").split(",") if m]
+YOLO_MODEL_MEMORY_MB = float(os.environ.get("YOLO_MODEL_MEMORY_MB", "2048"))
+
+
+def _model_bytes(model: "YOLO") -> int:
+    """Size of the model's parameters and buffers, or of the exported file."""
+    net = model.model
+    if isinstance(net, str):
+        # Exported models keep the path; ONNX Runtime's memory tracks the file size.
+        return os.path.getsize(net)
+    tensors = list(net.parameters()) + list(net.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class _Entry:
+    def __init__(self) -> None:
+        self.model: "YOLO | None" = None
+        self.nbytes = 0
+        # Held while loading and while running inference.
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """LRU cache of loaded YOLO models under a memory budget."""
+
+    def __init__(self, memory_budget_mb: float = YOLO_MODEL_MEMORY_MB, backend: str = YOLO_BACKEND) -> None:
+        self.backend = backend
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters: Counter[str] = Counter()
+        self.load_seconds: dict[str, float] = {}
+
+    @contextmanager
+    def acquire(self, model_size: str):
+        """Yield the loaded model for ``model_size``, loading it on first use."""
+        with self._lock:
+            entry = self._entries.get(model_size)
+            if entry is None:
+                entry = self._entries[model_size] = _Entry()
+            self._entries.move_to_end(model_size)
+
+        with entry.lock:
+            if entry.model is None:
+                # Imported here so the API process only pays for torch if it runs inference.
+                from ultralytics import YOLO
+
+                self.counters["misses"] += 1
+                start = time.perf_counter()
+                entry.model = YOLO(weights_path(model_size, self.backend), task="detect")
+                entry.nbytes = _model_bytes(entry.model)
+                self.load_seconds[model_size] = round(time.perf_counter() - start, 3)
+                self.counters["loads"] += 1
+                logger.info("Loaded %s in %.2fs (%.1f MB)", model_size, self.load_seconds[model_size], entry.nbytes / 2**20)
+                self._evict(keep=model_size)
+            else:
+                self.counters["hits"] += 1
+            yield entry.model
+
+    def warm_up(self, model_sizes: list[str] = YOLO_WARMUP_MODELS) -> None:
+        """Load ``model_sizes`` and run one inference each so the first job is fast."""
+        blank = Image.new("RGB", (640, 640))
+        for model_size in model_sizes:
+            with self.acquire(model_size) as model:
+                model(blank, verbose=False)
+            self.counters["warmups"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            resident = {size: e.nbytes for size, e in self._entries.items() if e.model is not None}
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "backend": self.backend,
+            "resident": list(resident),
+            "resident_mb": round(sum(resident.values()) / 2**20, 1),
+            "memory_budget_mb": round(self.memory_budget / 2**20, 1),
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else None,
+            "load_seconds": dict(self.load_seconds),
+            **{name: self.counters[name] for name in ("hits", "misses", "loads", "evictions", "warmups")},
+        }
+
+    def _evict(self, keep: str) -> None:
+        # The newest model always stays, even if it alone exceeds the budget.
+        with self._lock:
+            total = sum(e.nbytes for e in self._entries.values())
+            for size in list(self._entries):
+                if total <= self.memory_budget:
+                    break
+                if size == keep:
+                    continue
+                entry = self._entries.pop(size)
+                total -= entry.nbytes
+                self.counters["evictions"] += 1
+                # A job still holding entry.lock keeps its reference until it finishes.
+                logger.info("Evicted %s from the model registry", size)
+
+
+registry = ModelRegistry()
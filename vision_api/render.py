@@ -0,0 +1,54 @@
+"""Annotated image rendering from stored detections.
+
+Draws on the full-resolution original, without the model. Eager jobs render
+right after inference (which only sees a downscaled copy, see preprocess.py).
+``render=lazy`` jobs render on first request from the stored original and
+the ``detections`` JSON, and the result is cached in S3 next to the original.
+"""
+
+import hashlib
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+from .storage import open_ref
+
+# The colors of Ultralytics' default palette. Ultralytics picks them by class id;
+# stored detections only have the class name, so _color picks by a hash of it.
+# A class keeps its color across jobs, but not the one Ultralytics would give it.
+_PALETTE = [
+    (255, 56, 56), (255, 157, 151), (255, 112, 31), (255, 178, 29), (207, 210, 49),
+    (72, 249, 10), (146, 204, 23), (61, 219, 134), (26, 147, 52), (0, 212, 187),
+    (44, 153, 168), (0, 194, 255), (52, 69, 147), (100, 115, 255), (0, 24, 236),
+    (132, 56, 255), (82, 0, 133), (203, 56, 255), (255, 149, 200), (255, 55, 199),
+]
+
+
+def _color(class_name: str) -> tuple[int, int, int]:
+    digest = hashlib.md5(class_name.encode()).digest()
+    return _PALETTE[digest[0] % len(_PALETTE)]
+
+
+def render_annotated(image_ref: str, detections: list[dict], quality: int = 90) -> bytes:
+    """Draw ``detections`` onto the referenced image and return it as JPEG bytes."""
+    with open_ref(image_ref) as fp:
+        img = Image.open(fp).convert("RGB")
+
+    draw = ImageDraw.Draw(img)
+    width = max(2, round(sum(img.size) / 2 * 0.003))
+    font = ImageFont.load_default(size=max(12, width * 6))
+    for det in detections:
+        color = _color(det["class_name"])
+        box = (det["x1"], det["y1"], det["x2"], det["y2"])
+        draw.rectangle(box, outline=color, width=width)
+
+        label = f"{det['class_name']} {det['confidence']:.2f}"
+        left, top, right, bottom = draw.textbbox((0, 0), label, font=font)
+        text_w, text_h = right - left, bottom - top + width
+        y = det["y1"] - text_h if det["y1"] >= text_h else det["y1"]
+        draw.rectangle((det["x1"], y, det["x1"] + text_w + 2 * width, y + text_h), fill=color)
+        draw.text((det["x1"] + width, y), label, fill=(255, 255, 255), font=font)
+
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
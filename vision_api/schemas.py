@@ -1,5 +1,6 @@
 """Pydantic schemas for the vision detection API."""
 
+from datetime import datetime
 from enum import Enum
 
 from pydantic import BaseModel
@@ -12,6 +13,17 @@ class JobStatus(str, Enum):
     failed = "failed"
 
 
+class RenderMode(str, Enum):
+    none = "none"  # no annotated image
+    eager = "eager"  # rendered by the detection task
+    lazy = "lazy"  # rendered on first GET /v1/detections/{job_id}/annotated
+
+
+class JobKind(str, Enum):
+    image = "image"
+    video = "video"  # per-frame results in GET /v1/detections/{job_id}/frames
+
+
 class Detection(BaseModel):
     class_name: str
     confidence: float
@@ -25,11 +37,78 @@ class JobResponse(BaseModel):
     job_id: str
     tenant_id: str
     status: JobStatus
-    created_at: str
-    completed_at: str | None = None
+    created_at: datetime
+    completed_at: datetime | None = None
     original_image_url: str | None = None
     annotated_image_url: str | None = None
+    render: RenderMode = RenderMode.eager
+    tiled: bool = False
+    kind: JobKind = JobKind.image
+    # Video jobs only: sampling stride and progress in sampled frames.
+    frame_stride: int | None = None
+    frames_processed: int | None = None
+    frames_total: int | None = None
+    callback_url: str | None = None
     detections: list[Detection] | None = None
     error: str | None = None
 
     model_config = {"from_attributes": True}
+
+
+class JobPage(BaseModel):
+    """One keyset-paginated page of detection jobs, newest first.
+
+    With a ``fields`` projection each item only carries the requested fields.
+    """
+
+    items: list[JobResponse]
+    next_cursor: str | None = None
+
+
+class FrameResult(BaseModel):
+    frame: int
+    timestamp_ms: float | None = None
+    detections: list[Detection]
+
+
+class FramePage(BaseModel):
+    """Per-frame results of a video job in frame order.
+
+    ``next_cursor`` is set while more frames may follow, including while the job
+    is still running; it is null once the job has finished and all frames are read.
+    """
+
+    status: JobStatus
+    frames_processed: int | None = None
+    frames_total: int | None = None
+    items: list[FrameResult]
+    next_cursor: int | None = None
+
+
+class ClassCount(BaseModel):
+    class_name: str
+    count: int
+    jobs: int
+    mean_confidence: float
+    max_confidence: float
+
+
+class DetectionStats(BaseModel):
+    """Aggregate counts over the normalized detections table, most frequent class first."""
+
+    total: int
+    jobs: int
+    classes: list[ClassCount]
+
+
+class WebhookDeadLetterResponse(BaseModel):
+    id: int
+    job_id: str
+    url: str
+    event: str
+    attempts: int
+    status_code: int | None = None
+    error: str | None = None
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
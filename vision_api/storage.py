@@ -1,10 +1,34 @@
-"""S3-compatible object storage via boto3 (MinIO or AWS S3)."""
+"""S3-compatible object storage via boto3 (MinIO or AWS S3).
 
+One boto3 client per process (clients are thread-safe) with a connection pool
+of ``S3_MAX_POOL_CONNECTIONS``. Objects of ``S3_MULTIPART_THRESHOLD_MB`` or
+more are uploaded as concurrent multipart uploads. Async code uses the
+``a*`` wrappers, which run the blocking boto3 calls on a dedicated I/O thread
+pool instead of on the event loop (or the default executor, which inference
+uses).
+
+Flows and tasks take image *references* rather than bytes, so Prefect never
+serializes or hashes image payloads: either an object key in ``S3_BUCKET`` or
+``file://<path>`` for the local spool file of an upload, used by the process
+that accepted it.
+"""
+
+import asyncio
+import mmap
 import os
+import tempfile
+import threading
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from io import BytesIO
+from typing import BinaryIO
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
+from botocore.exceptions import ClientError
 
 S3_ENDPOINT = os.environ.get("S3_ENDPOINT", "http://localhost:9000")
 S3_ACCESS_KEY = os.environ.get("S3_ACCESS_KEY", "minioadmin")
@@ -12,16 +36,57 @@ S3_SECRET_KEY = os.environ.get("S3_SECRET_KEY", "minioadmin")
 S3_BUCKET = os.environ.get("S3_BUCKET", "vision-jobs")
 S3_REGION = os.environ.get("S3_REGION", "us-east-1")
 
+S3_MAX_POOL_CONNECTIONS = int(os.environ.get("S3_MAX_POOL_CONNECTIONS", "32"))
+S3_IO_THREADS = int(os.environ.get("S3_IO_THREADS", "16"))
+S3_MULTIPART_THRESHOLD_MB = float(os.environ.get("S3_MULTIPART_THRESHOLD_MB", "8"))
+S3_MULTIPART_CHUNK_MB = float(os.environ.get("S3_MULTIPART_CHUNK_MB", "8"))
+S3_MULTIPART_CONCURRENCY = int(os.environ.get("S3_MULTIPART_CONCURRENCY", "8"))
+S3_DOWNLOAD_CHUNK_KB = int(os.environ.get("S3_DOWNLOAD_CHUNK_KB", "256"))
+
+# Where uploads are spooled (see uploads.py). /dev/shm avoids disk I/O but
+# counts against the container's memory.
+LOCAL_REF_DIR = os.environ.get("LOCAL_REF_DIR") or tempfile.gettempdir()
+
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=int(S3_MULTIPART_THRESHOLD_MB * 1024 * 1024),
+    multipart_chunksize=int(S3_MULTIPART_CHUNK_MB * 1024 * 1024),
+    max_concurrency=S3_MULTIPART_CONCURRENCY,
+)
+
+_io_executor = ThreadPoolExecutor(max_workers=S3_IO_THREADS, thread_name_prefix="s3-io")
+_client_lock = threading.Lock()
+_s3 = None
+
 
 def _client():
-    return boto3.client(
-        "s3",
-        endpoint_url=S3_ENDPOINT,
-        aws_access_key_id=S3_ACCESS_KEY,
-        aws_secret_access_key=S3_SECRET_KEY,
-        region_name=S3_REGION,
-        config=Config(signature_version="s3v4"),
-    )
+    """The process-wide S3 client, created on first use."""
+    global _s3
+    if _s3 is None:
+        with _client_lock:
+            if _s3 is None:
+                _s3 = boto3.client(
+                    "s3",
+                    endpoint_url=S3_ENDPOINT,
+                    aws_access_key_id=S3_ACCESS_KEY,
+                    aws_secret_access_key=S3_SECRET_KEY,
+                    region_name=S3_REGION,
+                    config=Config(
+                        signature_version="s3v4",
+                        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                        tcp_keepalive=True,
+                        retries={"mode": "standard", "max_attempts": 3},
+                    ),
+                )
+    return _s3
+
+
+def object_url(key: str) -> str:
+    return f"{S3_ENDPOINT}/{S3_BUCKET}/{key}"
+
+
+def key_from_url(url: str) -> str:
+    """Inverse of ``object_url``."""
+    return url.removeprefix(f"{S3_ENDPOINT}/{S3_BUCKET}/")
 
 
 def ensure_bucket() -> None:
@@ -32,14 +97,137 @@ def ensure_bucket() -> None:
         s3.create_bucket(Bucket=S3_BUCKET)
 
 
+def object_exists(key: str) -> bool:
+    try:
+        _client().head_object(Bucket=S3_BUCKET, Key=key)
+    except ClientError as exc:
+        if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+    return True
+
+
 def upload_bytes(key: str, data: bytes, content_type: str = "image/jpeg") -> str:
     """Upload bytes to S3 and return the object URL."""
-    s3 = _client()
-    s3.put_object(Bucket=S3_BUCKET, Key=key, Body=data, ContentType=content_type)
-    return f"{S3_ENDPOINT}/{S3_BUCKET}/{key}"
+    if len(data) >= _TRANSFER_CONFIG.multipart_threshold:
+        return upload_fileobj(key, BytesIO(data), content_type)
+    _client().put_object(Bucket=S3_BUCKET, Key=key, Body=data, ContentType=content_type)
+    return object_url(key)
+
+
+def upload_fileobj(key: str, fileobj: BinaryIO, content_type: str = "image/jpeg") -> str:
+    """Upload a file-like object, as a concurrent multipart upload if it is large."""
+    _client().upload_fileobj(
+        fileobj, S3_BUCKET, key, ExtraArgs={"ContentType": content_type}, Config=_TRANSFER_CONFIG
+    )
+    return object_url(key)
+
+
+def upload_ref(key: str, ref: str, content_type: str = "image/jpeg") -> str:
+    """Upload the local file behind a ``file://`` reference."""
+    with open(ref.removeprefix("file://"), "rb") as f:
+        return upload_fileobj(key, f, content_type)
 
 
 def download_bytes(key: str) -> bytes:
-    s3 = _client()
-    resp = s3.get_object(Bucket=S3_BUCKET, Key=key)
+    resp = _client().get_object(Bucket=S3_BUCKET, Key=key)
     return resp["Body"].read()
+
+
+def download_ref(key: str, suffix: str = "") -> str:
+    """Download an object to a local file (concurrent ranged GETs if large) and return its ``file://`` reference."""
+    fd, path = tempfile.mkstemp(prefix="vision-", suffix=suffix, dir=LOCAL_REF_DIR)
+    os.close(fd)
+    try:
+        _client().download_file(S3_BUCKET, key, path, Config=_TRANSFER_CONFIG)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return f"file://{path}"
+
+
+def iter_download(key: str, chunk_size: int = S3_DOWNLOAD_CHUNK_KB * 1024) -> Iterator[bytes]:
+    """Stream an object in chunks without holding all of it in memory."""
+    resp = _client().get_object(Bucket=S3_BUCKET, Key=key)
+    body = resp["Body"]
+    try:
+        yield from body.iter_chunks(chunk_size)
+    finally:
+        body.close()
+
+
+# -- async wrappers ---------------------------------------------------------
+
+
+async def _run_io(fn, /, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(_io_executor, partial(fn, *args, **kwargs))
+
+
+async def aobject_exists(key: str) -> bool:
+    return await _run_io(object_exists, key)
+
+
+async def aupload_bytes(key: str, data: bytes, content_type: str = "image/jpeg") -> str:
+    return await _run_io(upload_bytes, key, data, content_type)
+
+
+async def aupload_fileobj(key: str, fileobj: BinaryIO, content_type: str = "image/jpeg") -> str:
+    return await _run_io(upload_fileobj, key, fileobj, content_type)
+
+
+async def aupload_ref(key: str, ref: str, content_type: str = "image/jpeg") -> str:
+    return await _run_io(upload_ref, key, ref, content_type)
+
+
+async def adownload_bytes(key: str) -> bytes:
+    return await _run_io(download_bytes, key)
+
+
+async def adownload_ref(key: str, suffix: str = "") -> str:
+    return await _run_io(download_ref, key, suffix)
+
+
+async def astream_download(key: str, chunk_size: int = S3_DOWNLOAD_CHUNK_KB * 1024) -> AsyncIterator[bytes]:
+    """Async chunked download; each chunk is read on the I/O pool."""
+    resp = await _run_io(_client().get_object, Bucket=S3_BUCKET, Key=key)
+    body = resp["Body"]
+    chunks = body.iter_chunks(chunk_size)
+    try:
+        while chunk := await _run_io(next, chunks, b""):
+            yield chunk
+    finally:
+        body.close()
+
+
+# -- image references -------------------------------------------------------
+
+
+def write_local_ref(data: bytes, suffix: str = "") -> str:
+    """Write ``data`` to a local file and return its ``file://`` reference."""
+    fd, path = tempfile.mkstemp(prefix="vision-", suffix=suffix, dir=LOCAL_REF_DIR)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return f"file://{path}"
+
+
+@contextmanager
+def open_ref(ref: str):
+    """Yield a seekable binary file for an image reference.
+
+    Local references are memory-mapped, so the image is read from the page
+    cache instead of being copied onto the Python heap.
+    """
+    if ref.startswith("file://"):
+        with open(ref.removeprefix("file://"), "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+    else:
+        yield BytesIO(download_bytes(ref))
+
+
+def release_ref(ref: str) -> None:
+    """Delete the local file behind a ``file://`` reference; object keys are kept."""
+    if ref.startswith("file://"):
+        try:
+            os.unlink(ref.removeprefix("file://"))
+        except FileNotFoundError:
+            pass
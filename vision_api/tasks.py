@@ -1,49 +1,115 @@
 """Prefect tasks for YOLOv8 object detection."""
 
-from io import BytesIO
-
-from PIL import Image
 from prefect import task
-from ultralytics import YOLO
+
+from .preprocess import YOLO_IMGSZ, Prepared, load_for_inference, timed
+from .registry import registry
+from .render import render_annotated
+from .storage import upload_bytes
+from .tiling import detect_tiles, merge_tiles
 
 
 @task(name="run_yolov8_detection", retries=1)
 def run_yolov8_detection(
-    image_bytes: bytes,
+    image_ref: str,
+    annotated_key: str | None = None,
     confidence_threshold: float = 0.25,
     model_size: str = "yolov8n",
 ) -> dict:
-    """Run YOLOv8 inference on an image.
+    """Run YOLOv8 inference on a stored image (see storage.py for references).
 
-    Returns dict with 'detections' (list of bbox dicts) and 'annotated_image_bytes'.
+    Returns dict with 'detections' (list of bbox dicts in original image
+    coordinates), 'annotated_image_url' and per-stage 'timings' in ms. The
+    annotated image is uploaded to ``annotated_key``; with no key it is not
+    rendered.
     """
-    model = YOLO(f"{model_size}.pt")
-
-    img = Image.open(BytesIO(image_bytes)).convert("RGB")
-
-    results = model(img, conf=confidence_threshold)
-    result = results[0]
-
-    detections = []
-    for box in result.boxes:
-        cls_id = int(box.cls[0])
-        detections.append({
-            "class_name": result.names[cls_id],
-            "confidence": round(float(box.conf[0]), 4),
-            "x1": round(float(box.xyxy[0][0]), 1),
-            "y1": round(float(box.xyxy[0][1]), 1),
-            "x2": round(float(box.xyxy[0][2]), 1),
-            "y2": round(float(box.xyxy[0][3]), 1),
-        })
-
-    # Render annotated image
-    annotated = result.plot()  # numpy BGR array
-    annotated_img = Image.fromarray(annotated[..., ::-1])  # BGR -> RGB
-    buf = BytesIO()
-    annotated_img.save(buf, format="JPEG", quality=90)
-    annotated_bytes = buf.getvalue()
+    timings: dict[str, float] = {}
+    prepared = load_for_inference(image_ref, timings)
+
+    with timed(timings, "infer"), registry.acquire(model_size) as model:
+        results = model(prepared.image, conf=confidence_threshold, imgsz=YOLO_IMGSZ)
+    return _to_output(results[0], prepared, image_ref, annotated_key, timings)
+
+
+@task(name="run_yolov8_detection_batch", retries=1)
+def run_yolov8_detection_batch(
+    image_refs: list[str],
+    annotated_keys: list[str | None],
+    confidence_threshold: float = 0.25,
+    model_size: str = "yolov8n",
+) -> list[dict]:
+    """Run YOLOv8 inference on several images in one forward pass.
+
+    Ultralytics letterboxes the images to a common shape and maps boxes back to
+    each (preprocessed) image. Returns one result dict per image, in order; the
+    forward pass time is split evenly between them. The images usually come
+    from different jobs (and tenants), so an image that fails to decode, render
+    or upload gets ``{"error": ...}`` instead of failing the whole batch.
+    """
+    timings = [{} for _ in image_refs]
+    outputs: list[dict] = [{} for _ in image_refs]
+    prepared: dict[int, Prepared] = {}
+    for i, (ref, t) in enumerate(zip(image_refs, timings)):
+        try:
+            prepared[i] = load_for_inference(ref, t)
+        except Exception as exc:
+            outputs[i] = {"error": f"Could not decode image: {exc}"}
+    if not prepared:
+        return outputs
+
+    shared: dict[str, float] = {}
+    with timed(shared, "infer"), registry.acquire(model_size) as model:
+        results = model([p.image for p in prepared.values()], conf=confidence_threshold, imgsz=YOLO_IMGSZ)
+    for (i, p), result in zip(prepared.items(), results):
+        timings[i]["infer"] = shared["infer"] / len(prepared)
+        try:
+            outputs[i] = _to_output(result, p, image_refs[i], annotated_keys[i], timings[i])
+        except Exception as exc:
+            outputs[i] = {"error": str(exc)}
+    return outputs
+
+
+@task(name="run_yolov8_tiled_detection", retries=1)
+def run_yolov8_tiled_detection(
+    image_ref: str,
+    annotated_key: str | None = None,
+    confidence_threshold: float = 0.25,
+    model_size: str = "yolov8n",
+) -> dict:
+    """Run YOLOv8 on overlapping full-resolution tiles and merge them (see tiling.py).
+
+    Returns the same dict as ``run_yolov8_detection``.
+    """
+    partial = detect_tiles(image_ref, confidence_threshold, model_size)
+    return merge_tiles(image_ref, annotated_key, [partial])
+
+
+def _to_output(
+    result, prepared: Prepared, image_ref: str, annotated_key: str | None, timings: dict[str, float]
+) -> dict:
+    with timed(timings, "postprocess"):
+        detections = []
+        boxes = result.boxes
+        for cls_id, conf, xyxy in zip(boxes.cls.tolist(), boxes.conf.tolist(), boxes.xyxy.tolist()):
+            x1, y1, x2, y2 = prepared.rescale(*xyxy)
+            detections.append({
+                "class_name": result.names[int(cls_id)],
+                "confidence": round(conf, 4),
+                "x1": round(x1, 1),
+                "y1": round(y1, 1),
+                "x2": round(x2, 1),
+                "y2": round(y2, 1),
+            })
+
+    annotated_url = None
+    if annotated_key is not None:
+        # Drawn on the original, not the downscaled model input.
+        with timed(timings, "encode"):
+            image = render_annotated(image_ref, detections)
+        annotated_url = upload_bytes(annotated_key, image)
 
     return {
         "detections": detections,
-        "annotated_image_bytes": annotated_bytes,
+        "annotated_image_url": annotated_url,
+        "timings": {stage: round(ms, 2) for stage, ms in timings.items()},
     }
@@ -0,0 +1,158 @@
+"""Tiled inference for very large images (drone, satellite).
+
+Normally the whole image is scaled down to ``YOLO_IMGSZ``, so objects only a
+few pixels wide disappear. A ``tiled`` job instead decodes the image at full
+resolution and cuts it into ``TILE_SIZE`` squares that overlap by
+``TILE_OVERLAP`` (a fraction of the tile). Each tile runs at native
+resolution, up to ``TILE_BATCH`` tiles per forward pass. Boxes are shifted
+back into image coordinates and merged with class-wise cross-tile NMS.
+
+The merge uses intersection over the *smaller* box, at
+``TILE_NMS_THRESHOLD``. An object cut by a tile edge then merges into the
+whole detection from the overlapping tile, which IoU would keep as two boxes.
+Objects larger than a tile are still split; raise ``TILE_SIZE`` for those.
+
+With an inference process pool, ``run_tiled`` spreads a job's tiles over
+all of its processes.
+"""
+
+import asyncio
+import os
+
+import numpy as np
+from PIL import Image
+
+from .preprocess import timed
+from .registry import registry
+from .render import render_annotated
+from .storage import open_ref, upload_bytes
+
+TILE_SIZE = int(os.environ.get("TILE_SIZE", "640"))
+TILE_OVERLAP = float(os.environ.get("TILE_OVERLAP", "0.2"))
+TILE_BATCH = int(os.environ.get("TILE_BATCH", "8"))
+TILE_NMS_THRESHOLD = float(os.environ.get("TILE_NMS_THRESHOLD", "0.5"))
+
+
+def _starts(length: int, size: int, step: int) -> list[int]:
+    if length <= size:
+        return [0]
+    starts = list(range(0, length - size, step))
+    # The last tile is flush with the edge rather than running past it.
+    return starts + [length - size]
+
+
+def tile_grid(
+    width: int, height: int, size: int = TILE_SIZE, overlap: float = TILE_OVERLAP
+) -> list[tuple[int, int, int, int]]:
+    """``(x1, y1, x2, y2)`` crops covering the image; a small image is a single tile."""
+    step = max(1, int(size * (1 - overlap)))
+    return [
+        (x, y, min(x + size, width), min(y + size, height))
+        for y in _starts(height, size, step)
+        for x in _starts(width, size, step)
+    ]
+
+
+def merge_detections(detections: list[dict], threshold: float = TILE_NMS_THRESHOLD) -> list[dict]:
+    """Greedy class-wise NMS over intersection-over-smaller-box, highest confidence first."""
+    if not detections:
+        return []
+    boxes = np.array([[d["x1"], d["y1"], d["x2"], d["y2"]] for d in detections], dtype=np.float64)
+    scores = np.array([d["confidence"] for d in detections])
+    _, classes = np.unique([d["class_name"] for d in detections], return_inverse=True)
+    areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        w = np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0])
+        h = np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1])
+        inter = np.maximum(w, 0) * np.maximum(h, 0)
+        smaller = np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        duplicate = (inter / smaller > threshold) & (classes[rest] == classes[i])
+        order = rest[~duplicate]
+    return [detections[i] for i in keep]
+
+
+def detect_tiles(
+    image_ref: str, confidence_threshold: float, model_size: str, part: int = 0, parts: int = 1
+) -> dict:
+    """Detect on every ``parts``-th tile starting at ``part``; boxes in image coordinates, unmerged.
+
+    Module-level and picklable so the parts of one image can run in different
+    inference processes. Each part decodes the image itself.
+    """
+    timings: dict[str, float] = {}
+    with timed(timings, "decode"), open_ref(image_ref) as fp:
+        img = Image.open(fp).convert("RGB")
+    tiles = tile_grid(*img.size)[part::parts]
+
+    detections = []
+    with registry.acquire(model_size) as model:
+        for i in range(0, len(tiles), TILE_BATCH):
+            chunk = tiles[i:i + TILE_BATCH]
+            # Cropping is this mode's resize stage.
+            with timed(timings, "resize"):
+                crops = [img.crop(box) for box in chunk]
+            with timed(timings, "infer"):
+                results = model(crops, conf=confidence_threshold, imgsz=TILE_SIZE)
+            with timed(timings, "postprocess"):
+                for (x0, y0, _, _), result in zip(chunk, results):
+                    boxes = result.boxes
+                    for cls_id, conf, (x1, y1, x2, y2) in zip(
+                        boxes.cls.tolist(), boxes.conf.tolist(), boxes.xyxy.tolist()
+                    ):
+                        detections.append({
+                            "class_name": result.names[int(cls_id)],
+                            "confidence": conf,
+                            "x1": x1 + x0,
+                            "y1": y1 + y0,
+                            "x2": x2 + x0,
+                            "y2": y2 + y0,
+                        })
+    return {"detections": detections, "tiles": len(tiles), "timings": timings}
+
+
+def merge_tiles(image_ref: str, annotated_key: str | None, partials: list[dict]) -> dict:
+    """Merge ``detect_tiles`` parts into the usual detection result, rendering if asked."""
+    timings: dict[str, float] = {}
+    for partial in partials:
+        for stage, ms in partial["timings"].items():
+            timings[stage] = timings.get(stage, 0.0) + ms
+
+    with timed(timings, "postprocess"):
+        merged = merge_detections([d for partial in partials for d in partial["detections"]])
+        detections = [
+            {
+                "class_name": d["class_name"],
+                "confidence": round(d["confidence"], 4),
+                **{k: round(d[k], 1) for k in ("x1", "y1", "x2", "y2")},
+            }
+            for d in merged
+        ]
+
+    annotated_url = None
+    if annotated_key is not None:
+        with timed(timings, "encode"):
+            image = render_annotated(image_ref, detections)
+        annotated_url = upload_bytes(annotated_key, image)
+
+    return {
+        "detections": detections,
+        "annotated_image_url": annotated_url,
+        "timings": {stage: round(ms, 2) for stage, ms in timings.items()},
+    }
+
+
+async def run_tiled(
+    pool, image_ref: str, annotated_key: str | None, confidence_threshold: float, model_size: str
+) -> dict:
+    """Run a tiled detection with its tiles split across ``pool``'s processes (an ``InferencePool``)."""
+    parts = max(1, pool.processes)
+    partials = await asyncio.gather(*(
+        pool.run(detect_tiles, image_ref, confidence_threshold, model_size, part, parts)
+        for part in range(parts)
+    ))
+    return await pool.run(merge_tiles, image_ref, annotated_key, list(partials))
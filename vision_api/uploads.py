@@ -0,0 +1,131 @@
+"""Bounded image uploads.
+
+``UploadLimitMiddleware`` rejects request bodies over ``UPLOAD_MAX_MB`` (or
+the limit it is given, e.g. ``VIDEO_UPLOAD_MAX_MB``) with 413 while they are
+still arriving: up front from ``Content-Length``, or as soon as a chunked body
+crosses the limit. While parsing the form, Starlette
+spools the file part itself (in memory up to 1 MB, then to a temporary file).
+``spool_upload`` then copies it in ``UPLOAD_CHUNK_KB`` chunks to a spool file
+in ``LOCAL_REF_DIR``, hashing it on the way, in a worker thread so the disk
+writes don't block the event loop. Starlette's copy has no path, so this
+second one is what the job's ``file://`` image reference points at.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, NamedTuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from .storage import LOCAL_REF_DIR
+
+UPLOAD_MAX_MB = float(os.environ.get("UPLOAD_MAX_MB", "25"))
+UPLOAD_CHUNK_KB = int(os.environ.get("UPLOAD_CHUNK_KB", "1024"))
+
+UPLOAD_MAX_BYTES = int(UPLOAD_MAX_MB * 1024 * 1024)
+
+# Allowance for multipart boundaries and the other form fields.
+_FORM_OVERHEAD = 64 * 1024
+
+
+class SpooledUpload(NamedTuple):
+    ref: str  # file:// reference to the spool file
+    size: int
+    sha256: str
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes / (1024 * 1024):g} MB")
+
+
+def _copy(src: BinaryIO, fd: int, max_bytes: int) -> tuple[int, str]:
+    hasher = hashlib.sha256()
+    size = 0
+    with os.fdopen(fd, "wb") as out:
+        while chunk := src.read(UPLOAD_CHUNK_KB * 1024):
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(max_bytes)
+            hasher.update(chunk)
+            out.write(chunk)
+    return size, hasher.hexdigest()
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> SpooledUpload:
+    """Copy ``file`` to a spool file off the event loop, enforcing ``max_bytes`` and computing its SHA-256."""
+    fd, path = tempfile.mkstemp(prefix="vision-upload-", dir=LOCAL_REF_DIR)
+    try:
+        size, sha256 = await asyncio.to_thread(_copy, file.file, fd, max_bytes)
+    except BaseException:
+        os.unlink(path)
+        raise
+    if size == 0:
+        os.unlink(path)
+        raise HTTPException(status_code=400, detail="Empty upload")
+    return SpooledUpload(f"file://{path}", size, sha256)
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware capping request body size on the given paths."""
+
+    def __init__(self, app, paths: tuple[str, ...], max_bytes: int = UPLOAD_MAX_BYTES) -> None:
+        self.app = app
+        self.paths = paths
+        self.max_bytes = max_bytes
+        self.max_body = max_bytes + _FORM_OVERHEAD
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_body:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    exceeded = True
+                    raise _BodyTooLarge
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if exceeded:
+                # The app may turn the aborted body into its own error (e.g. 400
+                # from form parsing); answer 413 instead.
+                if message["type"] == "http.response.start" and not started:
+                    started = True
+                    await self._reject(scope, receive, send)
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            if not started:
+                started = True
+                await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send) -> None:
+        response = JSONResponse({"detail": _too_large(self.max_bytes).detail}, status_code=413)
+        await response(scope, receive, send)
@@ -0,0 +1,232 @@
+"""Video detection jobs.
+
+A video job runs the detector on every ``frame_stride``-th frame of an
+uploaded video, or of a video object already in the bucket. The video is
+decoded as a stream with OpenCV (an ultralytics dependency), so only one
+batch of frames is ever in memory. OpenCV is imported on first use, so API
+processes that never run a video job don't load it. It is processed in segments of
+``VIDEO_SEGMENT_FRAMES`` sampled frames, ``VIDEO_BATCH_SIZE`` frames per
+forward pass. Each segment's per-frame detections are inserted into
+``video_frames`` as soon as it finishes, together with the job's
+``frames_processed``. ``GET /v1/detections/{job_id}/frames`` pages through
+them while the job is still running.
+
+Each frame's boxes also go into the normalized ``detections`` table (see
+analytics.py) in the same transaction.
+
+Segments cover fixed frame ranges, so with an inference process pool several
+run at once, one per process; they are still written in order. Each segment
+seeks to its first frame and checks where the seek landed (see ``_seek``), so
+frame indexes stay exact. A job that is retaken after its executor died
+resumes after its last written segment.
+"""
+
+import asyncio
+import math
+import os
+from typing import TYPE_CHECKING
+
+from sqlalchemy import func, insert, select, update
+
+from .analytics import detection_rows
+from .database import async_session
+from .models import DetectionJob, DetectionRecord, VideoFrame
+from .registry import registry
+from .storage import adownload_ref, release_ref
+
+if TYPE_CHECKING:
+    import cv2
+
+VIDEO_FRAME_STRIDE = int(os.environ.get("VIDEO_FRAME_STRIDE", "1"))
+VIDEO_BATCH_SIZE = int(os.environ.get("VIDEO_BATCH_SIZE", "16"))
+VIDEO_SEGMENT_FRAMES = int(os.environ.get("VIDEO_SEGMENT_FRAMES", "256"))
+VIDEO_UPLOAD_MAX_MB = float(os.environ.get("VIDEO_UPLOAD_MAX_MB", "2048"))
+
+
+def _open(video_ref: str) -> "cv2.VideoCapture":
+    import cv2
+
+    cap = cv2.VideoCapture(video_ref.removeprefix("file://"))
+    if not cap.isOpened():
+        raise ValueError("Could not decode video")
+    return cap
+
+
+def probe_video(video_ref: str) -> tuple[int, float]:
+    """``(frame_count, fps)`` from the container header; either may be 0 if unknown."""
+    import cv2
+
+    cap = _open(video_ref)
+    try:
+        return max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0), cap.get(cv2.CAP_PROP_FPS) or 0.0
+    finally:
+        cap.release()
+
+
+def _seek(cap: "cv2.VideoCapture", video_ref: str, frame: int) -> "cv2.VideoCapture":
+    """Position a capture so the next ``grab()`` returns ``frame``.
+
+    Seeking lands on a keyframe and is not frame-accurate for every container
+    and codec. If the position reported after the seek is short of ``frame``,
+    the gap is decoded forward; if it is past it (or the seek failed), the
+    video is reopened and decoded from the start. Returns the capture to use;
+    if the video ends before ``frame``, its next ``grab()`` fails.
+    """
+    import cv2
+
+    position = -1
+    if cap.set(cv2.CAP_PROP_POS_FRAMES, frame):
+        position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if not 0 <= position <= frame:
+        cap.release()
+        cap = _open(video_ref)
+        position = 0
+    for _ in range(frame - position):
+        if not cap.grab():
+            break
+    return cap
+
+
+def detect_segment(
+    video_ref: str,
+    first_frame: int,
+    last_frame: int,
+    stride: int,
+    confidence_threshold: float,
+    model_size: str,
+) -> dict:
+    """Detect on the sampled frames in ``[first_frame, last_frame)`` of a local video.
+
+    Returns ``{"frames": [{"frame", "timestamp_ms", "detections"}], "ended": bool}``.
+    ``ended`` is true if the video ends in this segment. Module-level and
+    picklable, so segments can run in inference pool processes.
+    """
+    import cv2
+
+    cap = _open(video_ref)
+    frames: list[dict] = []
+    batch: list[tuple[int, object]] = []
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+    def flush() -> None:
+        with registry.acquire(model_size) as model:
+            results = model([image for _, image in batch], conf=confidence_threshold)
+        for (index, _), result in zip(batch, results):
+            boxes = result.boxes
+            frames.append({
+                "frame": index,
+                "timestamp_ms": round(index * 1000 / fps, 1) if fps else None,
+                "detections": [
+                    {
+                        "class_name": result.names[int(cls_id)],
+                        "confidence": round(conf, 4),
+                        "x1": round(x1, 1),
+                        "y1": round(y1, 1),
+                        "x2": round(x2, 1),
+                        "y2": round(y2, 1),
+                    }
+                    for cls_id, conf, (x1, y1, x2, y2) in zip(
+                        boxes.cls.tolist(), boxes.conf.tolist(), boxes.xyxy.tolist()
+                    )
+                ],
+            })
+        batch.clear()
+
+    ended = False
+    try:
+        if first_frame:
+            cap = _seek(cap, video_ref, first_frame)
+        for index in range(first_frame, last_frame):
+            # grab() demuxes and decodes; retrieve() only converts frames we keep.
+            if not cap.grab():
+                ended = True
+                break
+            if index % stride:
+                continue
+            ok, image = cap.retrieve()
+            if not ok:
+                ended = True
+                break
+            batch.append((index, image))
+            if len(batch) == VIDEO_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    finally:
+        cap.release()
+    return {"frames": frames, "ended": ended}
+
+
+async def _write_segment(job, frames: list[dict]) -> None:
+    job_id = job.job_id
+    async with async_session() as session:
+        if frames:
+            await session.execute(
+                insert(VideoFrame),
+                [
+                    {"job_id": job_id, "frame_index": f["frame"], "timestamp_ms": f["timestamp_ms"],
+                     "detections": f["detections"]}
+                    for f in frames
+                ],
+            )
+            records = [
+                r for f in frames
+                for r in detection_rows(job_id, job.tenant_id, job.created_at, f["detections"], f["frame"])
+            ]
+            if records:
+                await session.execute(insert(DetectionRecord), records)
+        await session.execute(
+            update(DetectionJob)
+            .where(DetectionJob.job_id == job_id)
+            .values(frames_processed=DetectionJob.frames_processed + len(frames))
+        )
+        await session.commit()
+
+
+async def run_video(
+    pool, job, video_ref: str, confidence_threshold: float, model_size: str, stride: int
+) -> dict:
+    """Run a video job to the end through ``pool`` (an ``InferencePool``), writing frames as it goes.
+
+    ``job`` is the job's ``JobStateStore.start`` row. Object keys are first
+    downloaded to a local file, since OpenCV decodes from a path; the copy is
+    deleted afterwards.
+    """
+    job_id = job.job_id
+    local_ref = video_ref if video_ref.startswith("file://") else await adownload_ref(video_ref)
+    try:
+        frame_count, _ = await asyncio.to_thread(probe_video, local_ref)
+        span = VIDEO_SEGMENT_FRAMES * stride
+
+        async with async_session() as session:
+            last = await session.scalar(select(func.max(VideoFrame.frame_index)).where(VideoFrame.job_id == job_id))
+            processed = await session.scalar(select(func.count()).where(VideoFrame.job_id == job_id))
+            await session.execute(
+                update(DetectionJob)
+                .where(DetectionJob.job_id == job_id)
+                .values(
+                    frames_total=math.ceil(frame_count / stride) if frame_count else None,
+                    frames_processed=processed,
+                )
+            )
+            await session.commit()
+        # Segments are written whole, so a retaken job resumes after the last one.
+        segment = 0 if last is None else last // span + 1
+
+        ended = False
+        while not ended:
+            wave = range(segment, segment + max(1, pool.processes))
+            results = await asyncio.gather(*(
+                pool.run(detect_segment, local_ref, s * span, (s + 1) * span, stride, confidence_threshold, model_size)
+                for s in wave
+            ))
+            for result in results:
+                if ended:
+                    break
+                await _write_segment(job, result["frames"])
+                ended = result["ended"]
+            segment = wave.stop
+    finally:
+        if local_ref != video_ref:
+            release_ref(local_ref)
+    return {"detections": None, "annotated_image_url": None}
@@ -0,0 +1,303 @@
+"""Signed completion webhooks for detection jobs.
+
+A job created with a ``callback_url`` (or by a tenant with a default in
+``TENANT_WEBHOOKS``) gets a POST when it completes or fails, so clients don't
+have to poll ``/v1/detections/{job_id}/status``. The body is
+``{"event": "detection.completed" | "detection.failed", "job": {...}}``, where
+``job`` is what ``GET /v1/detections/{job_id}`` returns. Each request carries:
+
+- ``X-Vision-Event``: the event name.
+- ``X-Vision-Delivery``: an id unique to this delivery, kept across its retries.
+- ``X-Vision-Signature``: ``t=<unix time>,v1=<hex HMAC-SHA256 of "<t>.<body>">``
+  keyed with the job's tenant's secret. Receivers check it with
+  ``verify_signature``. Nothing is sent for a tenant without a secret.
+
+Deliveries share one pooled ``httpx.AsyncClient``, at most
+``WEBHOOK_CONCURRENCY`` in flight per process. Connection errors, timeouts,
+429 and 5xx responses are retried, up to ``WEBHOOK_MAX_ATTEMPTS`` attempts,
+with jittered exponential backoff starting at ``WEBHOOK_BACKOFF_SECONDS``.
+Other responses (redirects are not followed) and exhausted retries write a
+``webhook_dead_letters`` row, which the tenant can list and redeliver.
+
+Callback URLs are resolved when a job is created and again before every
+attempt, and refused if any address is loopback, private, link-local or
+otherwise not public, so a tenant can't aim the service at internal hosts.
+Each attempt connects to the address it checked, not to a fresh lookup that
+DNS rebinding could change. ``WEBHOOK_ALLOWED_HOSTS`` further limits callbacks
+to the listed hostnames; ``WEBHOOK_ALLOW_PRIVATE=true`` lifts the address check
+for local testing.
+
+Pending deliveries are held in memory by the process that finished the job.
+On shutdown, deliveries waiting out a backoff are dead-lettered at once rather
+than retried, so closing takes at most one request timeout and no delivery is
+lost without a dead-letter row. Delivery is at least once: a job retaken by another executor may be
+delivered twice, so receivers should dedupe on ``job.job_id``.
+
+A local stand-in receiver verifies and prints deliveries, optionally failing
+some of them to exercise retries:
+
+    uv run python -m vision_api.webhooks --secret "$SECRET" --port 8787 --fail-rate 0.3
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+from pydantic_core import to_json
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from .database import async_session
+from .models import DetectionJob, WebhookDeadLetter
+from .schemas import JobResponse, JobStatus
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_CONCURRENCY = int(os.environ.get("WEBHOOK_CONCURRENCY", "32"))
+WEBHOOK_TIMEOUT = float(os.environ.get("WEBHOOK_TIMEOUT", "10"))
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get("WEBHOOK_MAX_ATTEMPTS", "6"))
+WEBHOOK_BACKOFF_SECONDS = float(os.environ.get("WEBHOOK_BACKOFF_SECONDS", "1"))
+WEBHOOK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.environ.get("WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()
+}
+WEBHOOK_ALLOW_PRIVATE = os.environ.get("WEBHOOK_ALLOW_PRIVATE", "false").lower() == "true"
+
+
+class UnsafeCallbackURL(ValueError):
+    """A callback URL that is malformed, not allow-listed, or points at a non-public address."""
+
+
+def _is_public(address: ipaddress.IPv4Address | ipaddress.IPv6Address) -> bool:
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+
+async def resolve_callback(
+    url: str,
+    allowed_hosts: set[str] = WEBHOOK_ALLOWED_HOSTS,
+    allow_private: bool = WEBHOOK_ALLOW_PRIVATE,
+) -> str:
+    """Resolve ``url``'s host and return the address to connect to.
+
+    Raises ``UnsafeCallbackURL`` if the URL is not allowed, and ``OSError`` if
+    the host does not resolve.
+    """
+    parts = urlsplit(url)
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise UnsafeCallbackURL("callback_url has an invalid port") from None
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise UnsafeCallbackURL("callback_url must be an http(s) URL")
+    host = parts.hostname.lower()
+    if allowed_hosts and host not in allowed_hosts:
+        raise UnsafeCallbackURL(f"callback host {host} is not in WEBHOOK_ALLOWED_HOSTS")
+
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    addresses = [ipaddress.ip_address(info[4][0].split("%", 1)[0]) for info in infos]
+    # Every address must pass: a host that also resolves to an internal one is refused.
+    if not allow_private and not all(_is_public(address) for address in addresses):
+        raise UnsafeCallbackURL(f"callback host {host} resolves to a non-public address")
+    return str(addresses[0])
+
+
+def _pinned(url: str, address: str) -> tuple[str, str, dict]:
+    """``url`` with its host replaced by ``address``, plus the Host header and TLS name to keep."""
+    parts = urlsplit(url)
+    netloc = f"[{address}]" if ":" in address else address
+    if parts.port:
+        netloc += f":{parts.port}"
+    extensions = {"sni_hostname": parts.hostname} if parts.scheme == "https" else {}
+    return urlunsplit(parts._replace(netloc=netloc)), parts.netloc.rpartition("@")[2], extensions
+
+
+def sign(secret: str, timestamp: int, body: bytes) -> str:
+    """The ``X-Vision-Signature`` header value for ``body`` sent at ``timestamp``."""
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def verify_signature(secret: str, header: str, body: bytes, tolerance: float = 300) -> bool:
+    """Check an ``X-Vision-Signature`` header, rejecting timestamps older than ``tolerance`` seconds."""
+    try:
+        parts = dict(item.split("=", 1) for item in header.split(","))
+        timestamp = int(parts["t"])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(sign(secret, timestamp, body), f"t={timestamp},v1={parts.get('v1', '')}")
+
+
+class WebhookSender:
+    """Delivers job results to callback URLs in the background, with retries and dead-lettering."""
+
+    def __init__(
+        self,
+        secrets: dict[str, str] | None = None,
+        concurrency: int = WEBHOOK_CONCURRENCY,
+        timeout: float = WEBHOOK_TIMEOUT,
+        max_attempts: int = WEBHOOK_MAX_ATTEMPTS,
+        backoff_seconds: float = WEBHOOK_BACKOFF_SECONDS,
+        session_factory: async_sessionmaker = async_session,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        # Signing key per tenant; looked up at send time, so later changes apply.
+        self.secrets = {} if secrets is None else secrets
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._session_factory = session_factory
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending: set[asyncio.Task] = set()
+        self._closing = asyncio.Event()
+        self.counters: Counter[str] = Counter()
+
+    def submit(self, job_id: str, url: str) -> None:
+        """Deliver ``job_id``'s current state to ``url``; call once the job has finished."""
+        task = asyncio.create_task(self._deliver(job_id, url))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def close(self) -> None:
+        """Finish attempts in flight, dead-letter deliveries still due a retry, then close the client."""
+        self._closing.set()
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "concurrency": self.concurrency,
+            **{name: self.counters[name] for name in ("delivered", "retries", "dead_lettered")},
+        }
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            # One pool for all callback hosts; keep-alive saves a handshake per delivery.
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=False,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def _deliver(self, job_id: str, url: str) -> None:
+        async with self._session_factory() as session:
+            job = await session.get(DetectionJob, job_id)
+        if job is None:
+            return
+        event = "detection.completed" if job.status == JobStatus.completed else "detection.failed"
+        body = to_json({"event": event, "job": JobResponse.model_validate(job).model_dump(mode="json")})
+        delivery_id = str(uuid.uuid4())
+
+        status_code = error = None
+        secret = self.secrets.get(job.tenant_id)
+        for attempt in range(1, self.max_attempts + 1):
+            if not secret:
+                error = f"no webhook secret configured for {job.tenant_id}"
+                break
+            retryable = True
+            async with self._semaphore:
+                try:
+                    # Checked again on every attempt, and the request goes to the checked address.
+                    target, host, extensions = _pinned(url, await resolve_callback(url))
+                    headers = {
+                        "Host": host,
+                        "Content-Type": "application/json",
+                        "X-Vision-Event": event,
+                        "X-Vision-Delivery": delivery_id,
+                        "X-Vision-Signature": sign(secret, int(time.time()), body),
+                    }
+                    response = await self._http().post(target, content=body, headers=headers, extensions=extensions)
+                except UnsafeCallbackURL as exc:
+                    status_code, error = None, str(exc)
+                    break
+                except (OSError, httpx.HTTPError) as exc:
+                    status_code, error = None, f"{type(exc).__name__}: {exc}"
+                else:
+                    if response.is_success:
+                        self.counters["delivered"] += 1
+                        return
+                    status_code, error = response.status_code, f"HTTP {response.status_code}"
+                    retryable = response.status_code == 429 or response.status_code >= 500
+            if not retryable or attempt == self.max_attempts:
+                break
+            # Jitter keeps many failed deliveries to one host from retrying in lockstep.
+            delay = self.backoff_seconds * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            try:
+                await asyncio.wait_for(self._closing.wait(), delay)
+            except TimeoutError:
+                self.counters["retries"] += 1
+                continue
+            error = f"{error} (not retried: shutting down)"
+            break
+
+        self.counters["dead_lettered"] += 1
+        logger.warning("Webhook for job %s to %s failed after %d attempts: %s", job_id, url, attempt, error)
+        async with self._session_factory() as session:
+            await session.execute(
+                insert(WebhookDeadLetter).values(
+                    job_id=job_id,
+                    tenant_id=job.tenant_id,
+                    url=url,
+                    event=event,
+                    attempts=attempt,
+                    status_code=status_code,
+                    error=error,
+                    created_at=datetime.now(timezone.utc),
+                )
+            )
+            await session.commit()
+
+
+def _receiver(secret: str, fail_rate: float) -> type[BaseHTTPRequestHandler]:
+    class Receiver(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not verify_signature(secret, self.headers.get("X-Vision-Signature", ""), body):
+                status = 401
+            elif random.random() < fail_rate:
+                status = 503
+            else:
+                status = 204
+            print(status, self.headers.get("X-Vision-Event"), self.headers.get("X-Vision-Delivery"), body[:200].decode())
+            self.send_response(status)
+            self.end_headers()
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return Receiver
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local webhook receiver that verifies signatures")
+    parser.add_argument("--secret", required=True, help="The tenant's webhook signing secret")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of deliveries answered with 503")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), _receiver(args.secret, args.fail_rate))
+    print(f"Receiving webhooks on http://127.0.0.1:{args.port}/")
+    server.serve_forever()
@@ -0,0 +1,62 @@
+"""Standalone executor process that pulls detection jobs from the shared table.
+
+Run any number of these alongside the API. They pick up jobs submitted by
+submit-only API processes (``DISPATCH_IN_API=false``) and retake jobs whose
+owner died (expired lease), loading the original image from storage.
+
+    uv run python -m vision_api.worker --concurrency 2
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+
+from jobqueue.dispatcher import Dispatcher
+from jobqueue.scheduler import FairScheduler
+from jobqueue.schema import upgrade_schema
+
+from .app import TENANT_MAX_CONCURRENCY, TENANT_WEIGHTS, _run_detection, inference, jobstate, webhooks
+from .database import engine
+from .leases import leases
+from .models import Base
+from .storage import ensure_bucket
+
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "2"))
+WORKER_POLL_INTERVAL = float(os.environ.get("WORKER_POLL_INTERVAL", "1.0"))
+
+
+async def main(concurrency: int, exit_when_idle: bool) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade_schema, Base.metadata)
+    ensure_bucket()
+    await inference.start()
+
+    dispatcher = Dispatcher(
+        _run_detection,
+        leases,
+        concurrency=concurrency,
+        poll_interval=WORKER_POLL_INTERVAL,
+        scheduler=FairScheduler(TENANT_WEIGHTS, TENANT_MAX_CONCURRENCY),
+    )
+    await dispatcher.start()
+    try:
+        while True:
+            await asyncio.sleep(dispatcher.poll_interval)
+            if exit_when_idle and dispatcher.is_idle():
+                break
+    finally:
+        await dispatcher.stop()
+        await jobstate.flush()
+        await webhooks.close()
+        inference.shutdown()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument("--exit-when-idle", action="store_true", help="Exit once no queued jobs remain")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.concurrency, args.exit_when_idle))